@@ -1,174 +1,405 @@
-import time
+import logging
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from driver_setup import setup_driver
-from data_saver import save_to_json, save_to_google_sheets
-import pycountry
+from selenium.common.exceptions import TimeoutException
+from driver_setup import acquire_driver, release_driver
+from waits import open_listing, wait_for_dialog, wait_for_dialog_closed, save_wait_timings
+from crawl_pool import run_sharded
+from checkpoint import CheckpointStore, open_checkpoint
+from delta import DeltaSink, fingerprint, load_previous, build_cache, needs_full_refresh, mark_full_refresh
+from dom_extract import BRAND_CARD_FIELDS, BRAND_DIALOG_FIELDS, extract_all, extract_one, scroll_and_click, last_page_number
+from fast_path import API_BASE_URL, FastPathError, create_session, fetch_listing, fetch_details, get_field
+from pipeline import run_pipeline, IncompleteRun, JsonlSink, JsonSink, SheetsSink
+from country_matcher import find_countries
+from metrics import timer, count
+from datastore import SqliteSink
+from rate_control import TransientError, retry
+from prefetch import make_prefetcher
+
+logger = logging.getLogger(__name__)
+
+# Payload paths used by the HTTP fast path, keyed by the record field they fill
+BRAND_API_FIELDS = {
+    "Name": "name",
+    "Image URL": "image.thumb",
+    "Brand Description": "description",
+}
+
+# Listing-card fields that identify a brand, and those whose change means its pop-up must be re-read
+BRAND_KEY_FIELDS = ("Name",)
+BRAND_FINGERPRINT_FIELDS = ("Name", "Image URL")
+
+#Function to Build a Brand Record (shared by the Selenium and HTTP paths)
+def build_brand_record(name, image, brand_description, countries):
+    return {
+        "Name": name,
+        "Image URL": image,
+        "Brand Description": brand_description,
+        "Countries": countries
+    }
 
 #Function to Extract Brand Details
 #
 def extract_brand_details(product):
     """Extracts name and image from the product listing."""
-    try:
-        name = product.find_element(By.CLASS_NAME, "brand-list__item__name").text
-    except NoSuchElementException:
-        name = None
-    try:
-        image = product.find_element(By.TAG_NAME, "img").get_attribute("src")
-    except NoSuchElementException:
-        image = None
-    return name, image
+    card = extract_one(product.parent, BRAND_CARD_FIELDS, product)
+    return card["Name"], card["Image URL"]
 
 #Function to Extract Country from Description
 def extract_countries(text):
-    found_countries = [country.name for country in pycountry.countries if country.name in text]
-    return list(set(found_countries))  # Remove duplicates
+    # One pass of a precompiled matcher over names, official/common names, aliases and codes
+    return find_countries(text)
+
+#Function to Recompute the Countries of a Brand Reused from the Previous Run
+def derive_brand_fields(record):
+    brand_description = record.get("Brand Description")
+    return {**record, "Countries": extract_countries(brand_description) if brand_description else []}
 
 #Function to Extract Pop-up Details
 def extract_popup_details(driver):
     """Extracts product details from the pop-up dialog."""
-    try:
-        brand_description = driver.find_element(By.CLASS_NAME, "dialog-brand__description").text
-    except NoSuchElementException:
-        brand_description = None
+    brand_description = extract_one(driver, BRAND_DIALOG_FIELDS)["Brand Description"]
     countries = extract_countries(brand_description) if brand_description else []
     return brand_description,countries
 
 
+#Function to Build the URL of a Letter's First Listing and of one of its Pages
+def get_letter_url(base_url, encoded_letter):
+    return f"{base_url}&brands[filters][letter]={encoded_letter}"
+
+def get_page_url(base_url, encoded_letter, page):
+    return f"{base_url}&brands[pageNumber]={page}&brands[filters][letter]={encoded_letter}"
+
+def encode_letter(letter):
+    return "%23" if letter == "#" else letter
+
 #Function to Get Max Pages for a Letter
-def get_max_pages(driver, letter, base_url):
+def get_max_pages(driver, letter, base_url, prefetcher=None):
     """Extracts the maximum number of pages for the given letter."""
-    page_url = f"{base_url}&brands[filters][letter]={letter}"
-    driver.get(page_url)
-
-    try:
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "brand-list__item"))
-        )
-    except TimeoutException:
-        print(f"❌ No products found or page did not load for letter {letter}.")
+    page_url = get_letter_url(base_url, letter)
+    if not retry(open_listing, driver, page_url, "brand-list__item", "brand-list", prefetcher=prefetcher):
+        logger.info(f"No brands found for letter {letter}.")
         return 0
-    try:
-        pagination_elements = driver.find_elements(By.CSS_SELECTOR, "ul.el-pager li.number")
-        max_page = int(pagination_elements[-1].text)
-    except (NoSuchElementException, IndexError, ValueError):
-        max_page = 1 
-
-    return max_page
+    # A letter with a single page has no pager
+    return last_page_number(driver) or 1
 
 
 #Function to Scrape a Single Page
-def scrape_page(driver, url):
-    driver.get(url)
+def scrape_page(driver, url, checkpoint=None, cache=None, prefetcher=None, next_url=None):
+    """Returns the page's brands, or None past the last page; raises TransientError if the page did not load.
 
-    try:
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "brand-list__item"))
-        )
-    except TimeoutException:
-        print(f"❌ No products found or page did not load: {url}")
+    With a prefetcher, `next_url` starts loading in a background tab while this page's pop-ups are read.
+    """
+    if not open_listing(driver, url, "brand-list__item", "brand-list", prefetcher=prefetcher):
+        logger.info(f"No brands on {url}, past the last page.")
         return None
 
     brands = driver.find_elements(By.CLASS_NAME, "brand-list__item")
     if not brands:
-        print(f"❌ No products found on {url}. Stopping pagination.")
+        logger.error(f"❌ No products found on {url}. Stopping pagination.")
         return None
 
+    # Read every card's fields in a single round trip
+    with timer("extract"):
+        cards = extract_all(driver, ".brand-list__item", BRAND_CARD_FIELDS)
+
+    if prefetcher and next_url:
+        prefetcher.prefetch(next_url)
+
     scraped_data = []
     actions = ActionChains(driver)
+    dialog_locator = (By.CLASS_NAME, "dialog-brand__description")
+    previous_dialog = previous_dialog_text = None
+
+    for i, (brand, card) in enumerate(zip(brands, cards)):
+        # Reuse brands finished before an interruption
+        saved = checkpoint.get_item(url, i) if checkpoint else None
+        if saved:
+            scraped_data.append(saved)
+            count("checkpoint_hits")
+            continue
 
-    for i, brand in enumerate(brands):
         try:
-            name, image = extract_brand_details(brand)
-            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", brand)
-            time.sleep(1)
+            name, image = card["Name"], card["Image URL"]
 
-            driver.execute_script("arguments[0].click();", brand)
+            # Unchanged card: reuse last run's pop-up details instead of opening it
+            cached = cache.get(fingerprint(card, BRAND_FINGERPRINT_FIELDS)) if cache else None
+            if cached:
+                scraped_data.append(dict(cached))
+                count("cache_hits")
+                continue
 
+            # Wait for the pop-up to show this brand rather than the previous one
             try:
-                WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, "dialog-brand__description"))
-                )
+                with timer("popup_open"):
+                    scroll_and_click(driver, brand)
+                    previous_dialog = wait_for_dialog(driver, dialog_locator, previous_dialog, previous_dialog_text)
+                    previous_dialog_text = previous_dialog.text
             except TimeoutException:
-                print(f"⚠️ Pop-up did not appear for product {i + 1}. Skipping...")
+                logger.warning(f"⚠️ Pop-up did not appear for product {i + 1}. Skipping...")
+                count("popup_timeouts")
                 continue
 
-            brand_description,countries = extract_popup_details(driver)
+            # The description element the wait returned already holds the pop-up's only field
+            brand_description = previous_dialog_text
+            countries = extract_countries(brand_description)
 
-            actions.send_keys(Keys.ESCAPE).perform()
-            time.sleep(1)
+            with timer("popup_close"):
+                actions.send_keys(Keys.ESCAPE).perform()
+                wait_for_dialog_closed(driver, dialog_locator)
 
-            scraped_data.append({
-                "Name": name,
-                "Image URL": image,
-                "Brand Description": brand_description,
-                "Countries": countries
-            })
+            scraped_data.append(build_brand_record(name, image, brand_description, countries))
+            count("brands_scraped")
+            if checkpoint:
+                checkpoint.save_item(url, i, scraped_data[-1])
 
         except Exception as e:
-            print(f"❌ Error scraping product {i + 1}: {e}")
+            logger.error(f"❌ Error scraping product {i + 1}: {e}")
+            count("scrape_errors")
 
     return scraped_data
 
 #Function to Scrape Pages for a Letter
-def scrape_pages_for_letter(driver, base_url, letter):
+def scrape_pages_for_letter(driver, base_url, letter, checkpoint=None, cache=None, prefetcher=None, next_letter=None):
+    """With a prefetcher, each page's successor (or the next letter's first listing) loads in a background tab.
+
+    Raises IncompleteRun if a page still failed after its retries; the pages that finished stay checkpointed.
+    """
+    unit = f"letter:{letter}"
+    if checkpoint and checkpoint.is_done(unit):
+        logger.info(f"⏭️ Brands for {letter} already scraped, reusing checkpoint.")
+        return checkpoint.get_records(unit)
+
     all_data = []
-    encoded_letter = "%23" if letter == "#" else letter
-    max_pages = get_max_pages(driver, encoded_letter, base_url)
+    encoded_letter = encode_letter(letter)
+    # After the last page, the next letter's first listing is worth loading unless a checkpoint holds it
+    next_letter_url = None
+    if next_letter and not (checkpoint and checkpoint.is_done(f"letter:{next_letter}")):
+        next_letter_url = get_letter_url(base_url, encode_letter(next_letter))
+    try:
+        max_pages = get_max_pages(driver, encoded_letter, base_url, prefetcher)
+    except TransientError as e:
+        logger.error(f"❌ Giving up on letter {letter}: {e}")
+        count("pages_failed")
+        raise IncompleteRun(f"letter {letter} did not load") from e
 
     if max_pages == 0:
         return all_data
 
+    failed_pages = []
     for page in range(1, max_pages + 1):
-        print(f"Scraping Brands starting with {letter} (Page {page})...")
-        page_url = f"{base_url}&brands[pageNumber]={page}&brands[filters][letter]={encoded_letter}"
-        scraped_data = scrape_page(driver, page_url)
+        logger.info(f"Scraping Brands starting with {letter} (Page {page})...")
+        page_url = get_page_url(base_url, encoded_letter, page)
+        next_url = get_page_url(base_url, encoded_letter, page + 1) if page < max_pages else next_letter_url
+        if checkpoint and checkpoint.is_done(page_url):
+            scraped_data = checkpoint.get_records(page_url)
+        else:
+            try:
+                # A page that did not load is retried with backoff; one that still fails is skipped
+                scraped_data = retry(scrape_page, driver, page_url, checkpoint, cache, prefetcher, next_url)
+            except TransientError as e:
+                logger.error(f"❌ Giving up on {letter} page {page}: {e}")
+                count("pages_failed")
+                failed_pages.append(page)
+                continue
+            if checkpoint and scraped_data:
+                checkpoint.mark_done(page_url, scraped_data)
 
-        if not scraped_data:
+        if scraped_data is None:
             break
         
         all_data.extend(scraped_data)
 
+    # Only a letter whose pages all finished counts as done
+    if failed_pages:
+        raise IncompleteRun(f"letter {letter} pages {failed_pages} failed")
+    if checkpoint:
+        checkpoint.mark_done(unit, all_data)
+
     return all_data
 
-#Function to Scrape All Letters
-def scrape_all_letters(driver, base_url):
+#Function to Scrape a Single Page of a Letter over HTTP (no browser)
+def scrape_page_fast(session, letter, page, api_base_url=API_BASE_URL, cache=None):
+    items = fetch_listing(session, "brands", {"letter": letter, "pageNumber": page}, api_base_url)
+    if not items:
+        return None
+
+    # Only new or changed cards need their detail payload
+    cards = [{field: get_field(item, path) for field, path in BRAND_API_FIELDS.items()} for item in items]
+    cached = [cache.get(fingerprint(card, BRAND_FINGERPRINT_FIELDS)) if cache else None for card in cards]
+    missing = [item for item, record in zip(items, cached) if not record]
+    details = iter(fetch_details(session, "brands", missing, api_base_url))
+
+    scraped_data = []
+    for item, card, record in zip(items, cards, cached):
+        if record:
+            scraped_data.append(dict(record))
+            continue
+
+        detail = next(details)
+        fields = {field: get_field(detail, path) or card[field] for field, path in BRAND_API_FIELDS.items()}
+        brand_description = fields["Brand Description"]
+        countries = extract_countries(brand_description) if brand_description else []
+        scraped_data.append(build_brand_record(fields["Name"], fields["Image URL"], brand_description, countries))
+
+    return scraped_data
+
+#Function to Scrape All Pages of a Letter over HTTP; raises FastPathError if the backend fails
+def scrape_letter_fast(session, letter, api_base_url=API_BASE_URL, cache=None):
     all_data = []
-    
+    page = 1
+
+    while True:
+        logger.debug(f"Fetching Brands starting with {letter} (Page {page})...")
+        scraped_data = scrape_page_fast(session, letter, page, api_base_url, cache)
+        if not scraped_data:
+            break
+        all_data.extend(scraped_data)
+        page += 1
+
+    return all_data
+
+#Function to List the Letter Filters (A-Z and the special '#' character)
+def get_letters():
+    return [chr(letter) for letter in range(ord('A'), ord('Z') + 1)] + ['#']
+
+#Function to Stream Brands for the Given Letters
+def iter_letters(driver, base_url, characters, checkpoint=None, cache=None):
+    """Raises IncompleteRun after the last letter if any letter could not be scraped in full."""
+    failed_letters = []
+    prefetcher = make_prefetcher(driver)
+    try:
+        for i, char in enumerate(characters):
+            logger.info(f"Starting to scrape brands for {char}...")
+            next_letter = characters[i + 1] if i + 1 < len(characters) else None
+            try:
+                scraped_data = scrape_pages_for_letter(driver, base_url, char, checkpoint, cache, prefetcher, next_letter)
+            except IncompleteRun as e:
+                logger.error(f"❌ {e}, moving on to the next letter.")
+                failed_letters.append(char)
+                continue
+            if scraped_data:
+                yield from scraped_data
+    finally:
+        if prefetcher:
+            prefetcher.close()
+
+    if failed_letters:
+        raise IncompleteRun(f"brand letters {failed_letters} failed")
+
+#Function to Scrape All Letters
+def scrape_all_letters(driver, base_url, checkpoint=None, cache=None):
     # Loop over A-Z and the special '#' character
-    characters = [chr(letter) for letter in range(ord('A'), ord('Z') + 1)] + ['#']
-    
+    return list(iter_letters(driver, base_url, get_letters(), checkpoint, cache))
+
+#Function to Scrape a Shard of Letters in its Own Browser (runs in a worker process)
+def scrape_letter_shard(letters, base_url, cache=None):
+    """Returns {letter: records}; letters that could not be scraped in full are left out."""
+    driver = acquire_driver()
+    checkpoint = CheckpointStore("brands")  # Already reset by the parent unless resuming
+    prefetcher = make_prefetcher(driver)
+    results = {}
+
+    try:
+        for i, char in enumerate(letters):
+            logger.info(f"Starting to scrape brands for {char}...")
+            next_letter = letters[i + 1] if i + 1 < len(letters) else None
+            try:
+                results[char] = scrape_pages_for_letter(driver, base_url, char, checkpoint, cache, prefetcher, next_letter)
+            except IncompleteRun as e:
+                logger.error(f"❌ {e}, moving on to the next letter.")
+    finally:
+        if prefetcher:
+            prefetcher.close()
+        release_driver(driver)
+        checkpoint.close()
+
+    return results
+
+#Function to Scrape All Letters with a Pool of Browsers
+def scrape_all_letters_parallel(base_url, workers=4, cache=None, characters=None):
+    characters = characters or get_letters()
+    results, failed = run_sharded(scrape_letter_shard, characters, workers, base_url, cache)
+
+    # Merge in letter order so the output matches the sequential crawl
+    all_data = []
+    missing = []
     for char in characters:
-        print(f"Starting to scrape brands for {char}...")
-        scraped_data = scrape_pages_for_letter(driver, base_url, char)
-        if scraped_data:
-            all_data.extend(scraped_data)
+        if char not in results:
+            missing.append(char)  # Failed after its retries, or its worker did
+            continue
+        all_data.extend(results[char])
 
+    if missing:
+        raise IncompleteRun(f"brand letters {missing} failed" + (f", {len(set(failed) & set(missing))} of them in a crashed worker" if failed else ""))
     return all_data
 
-def brand_scraping():
-    base_url = "https://natrue.org/our-standard/natrue-certified-world/?database[tab]=brands"
-    driver = setup_driver()
-   
+#Function to Stream Letters from the Browser (single session or a pool of workers)
+def iter_with_selenium(base_url, characters, workers=1, checkpoint=None, cache=None):
+    if workers > 1:
+        yield from scrape_all_letters_parallel(base_url, workers, cache, characters)
+        return
+
+    driver = acquire_driver()
     try:
-        
-        # Scrape brands for all letters A-Z
-        scraped_data = scrape_all_letters(driver, base_url)
-        save_to_json(scraped_data, "Brands.json")
+        yield from iter_letters(driver, base_url, characters, checkpoint, cache)
+    finally:
+        release_driver(driver)
+        save_wait_timings("brands_wait_timings.json")
 
-        for entry in scraped_data:
-            if isinstance(entry["Countries"], list):
-               entry["Countries"] = ", ".join(entry["Countries"])  # Convert list to a string
+#Function to Stream all Brands, over HTTP first (with use_fast_path) and in the browser as the fallback
+def iter_brands(base_url, workers=1, use_fast_path=False, checkpoint=None, cache=None):
+    characters = get_letters()
 
-        save_to_google_sheets(scraped_data, ["Name", "Image URL", "Brand Description","Countries"], "Brands_sheet")#make sure google sheet is exist before run this function
+    if use_fast_path:
+        delivered = False
+        try:
+            session = create_session()
+            while characters:
+                # A letter is only emitted once all of its pages arrived
+                scraped_data = scrape_letter_fast(session, characters[0], cache=cache)
+                delivered = delivered or bool(scraped_data)
+                yield from scraped_data
+                characters = characters[1:]
+        except FastPathError as e:
+            logger.warning(f"⚠️ HTTP fast path failed ({e}). Falling back to Selenium from letter {characters[0]}...")
+
+        if not delivered:
+            characters = get_letters()  # An empty backend answer is treated as a failure
+
+    # Selenium picks up at the first letter the fast path did not deliver
+    if characters:
+        yield from iter_with_selenium(base_url, characters, workers, checkpoint, cache)
+
+def brand_scraping(workers=1, use_fast_path=False, resume=False, full_refresh=False):
+    base_url = "https://natrue.org/our-standard/natrue-certified-world/?database[tab]=brands"
+    checkpoint = open_checkpoint("brands", resume)  # Letters, pages and brands are recorded as they finish
+
+    # Pop-ups are only opened for new or changed cards, except on a periodic full refresh
+    previous = load_previous("Brands.json")
+    full_refresh = full_refresh or needs_full_refresh("brands")
+    cache = None if full_refresh else build_cache(previous, BRAND_FINGERPRINT_FIELDS, derive_brand_fields)
+
+    # Records are written to every sink as they are scraped; the Sheets sink joins the Countries list
+    sinks = [
+        JsonlSink("Brands.jsonl"),
+        JsonSink("Brands.json"),
+        SheetsSink(["Name", "Image URL", "Brand Description","Countries"], "Brands_sheet", key_column="Name"), #make sure google sheet is exist before run this function
+        DeltaSink("Brands", previous, BRAND_KEY_FIELDS, BRAND_FINGERPRINT_FIELDS),
+        SqliteSink("brands"),
+    ]
+    try:
+        records = run_pipeline(iter_brands(base_url, workers, use_fast_path, checkpoint, cache), sinks)
+    except IncompleteRun as e:
+        # The sinks kept the last complete run; the checkpoint holds the letters and pages that did finish
+        logger.error(f"❌ Brands crawl incomplete ({e}). Previous output kept, run again with --resume to fetch the rest.")
+        return
     finally:
-        driver.quit()
+        checkpoint.close()
+
+    if full_refresh and records:
+        mark_full_refresh("brands")
 
 # if we want to run only this piece of codde
 # brand_scraping()
-
-
@@ -0,0 +1,84 @@
+# checkpoint.py
+# SQLite checkpoint store so an interrupted crawl can resume where it stopped.
+import json
+import os
+import sqlite3
+
+CHECKPOINT_FILE = os.path.join("scraped_data", "checkpoints.sqlite3")
+
+
+class CheckpointStore:
+    """Records finished units (pages, letters) and finished items within a unit for one crawl."""
+
+    def __init__(self, crawl, path=CHECKPOINT_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.crawl = crawl
+        # Worker processes of a sharded crawl share the same database file
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS units (
+                crawl TEXT NOT NULL,
+                unit TEXT NOT NULL,
+                records TEXT NOT NULL,
+                PRIMARY KEY (crawl, unit)
+            );
+            CREATE TABLE IF NOT EXISTS items (
+                crawl TEXT NOT NULL,
+                unit TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                record TEXT NOT NULL,
+                PRIMARY KEY (crawl, unit, position)
+            );
+        """)
+
+    def reset(self):
+        """Forgets all progress of this crawl (used when a run is not resuming)."""
+        with self.connection:
+            self.connection.execute("DELETE FROM units WHERE crawl = ?", (self.crawl,))
+            self.connection.execute("DELETE FROM items WHERE crawl = ?", (self.crawl,))
+
+    def is_done(self, unit):
+        row = self.connection.execute(
+            "SELECT 1 FROM units WHERE crawl = ? AND unit = ?", (self.crawl, unit)
+        ).fetchone()
+        return row is not None
+
+    def get_records(self, unit):
+        row = self.connection.execute(
+            "SELECT records FROM units WHERE crawl = ? AND unit = ?", (self.crawl, unit)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def mark_done(self, unit, records):
+        """Stores the unit's records and drops its per-item progress."""
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO units (crawl, unit, records) VALUES (?, ?, ?)",
+                (self.crawl, unit, json.dumps(records, ensure_ascii=False)),
+            )
+            self.connection.execute("DELETE FROM items WHERE crawl = ? AND unit = ?", (self.crawl, unit))
+
+    def get_item(self, unit, position):
+        row = self.connection.execute(
+            "SELECT record FROM items WHERE crawl = ? AND unit = ? AND position = ?", (self.crawl, unit, position)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_item(self, unit, position, record):
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO items (crawl, unit, position, record) VALUES (?, ?, ?, ?)",
+                (self.crawl, unit, position, json.dumps(record, ensure_ascii=False)),
+            )
+
+    def close(self):
+        self.connection.close()
+
+
+#Function to open the checkpoint store for a crawl, clearing it unless resuming
+def open_checkpoint(crawl, resume=False):
+    checkpoint = CheckpointStore(crawl)
+    if not resume:
+        checkpoint.reset()
+    return checkpoint
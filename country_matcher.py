@@ -0,0 +1,128 @@
+# country_matcher.py
+# One precompiled regex over every country name, official name, common name,
+# alias and (unambiguous) alpha-3 code, built lazily on first use (pycountry
+# is imported then too). Names match in any case ("ITALY" in an address) but
+# must start with a capital, so words like "china", "turkey" or "jersey" don't.
+import re
+
+# Extra spellings found in addresses, mapped to the pycountry name
+ALIASES = {
+    "United States of America": "United States",
+    "Great Britain": "United Kingdom",
+    "England": "United Kingdom",
+    "Scotland": "United Kingdom",
+    "Wales": "United Kingdom",
+    "Northern Ireland": "United Kingdom",
+    "Korea": "Korea, Republic of",
+    "Russia": "Russian Federation",
+    "Turkey": "Türkiye",
+    "Holland": "Netherlands",
+    "Nederland": "Netherlands",
+    "Deutschland": "Germany",
+    "Österreich": "Austria",
+    "Schweiz": "Switzerland",
+    "Suisse": "Switzerland",
+    "Svizzera": "Switzerland",
+    "Italia": "Italy",
+    "España": "Spain",
+    "Belgique": "Belgium",
+    "België": "Belgium",
+    "Polska": "Poland",
+    "Sverige": "Sweden",
+    "Danmark": "Denmark",
+    "Norge": "Norway",
+    "Brasil": "Brazil",
+    "México": "Mexico",
+    "Macedonia": "North Macedonia",
+    "Swaziland": "Eswatini",
+    "Ivory Coast": "Côte d'Ivoire",
+    "Cape Verde": "Cabo Verde",
+}
+
+# Upper-case abbreviations, matched case-sensitively
+CODE_ALIASES = {
+    "USA": "United States",
+    "U.S.A.": "United States",
+    "UK": "United Kingdom",
+    "U.K.": "United Kingdom",
+    "UAE": "United Arab Emirates",
+}
+
+# Place names that contain a country name but are not that country
+IGNORED = ["New Jersey", "New Mexico", "New South Wales", "New Guinea"]
+
+# Alpha-3 codes that are also everyday words or abbreviations (e.g. "AND", "CAN", "VAT")
+AMBIGUOUS_CODES = {
+    "AND", "ARE", "ARM", "BEN", "BRA", "CAN", "COL", "COM", "DOM", "EST", "FIN", "GAB", "GEO",
+    "GUM", "GUY", "HUN", "IND", "JAM", "LIE", "LUX", "MAC", "MAR", "MUS", "NAM", "NOR", "PAN",
+    "PER", "POL", "SEN", "SUR", "TON", "VAT",
+}
+
+_matcher = None
+
+
+#Function to turn a list of words into a compact trie-shaped regex
+def trie_pattern(words):
+    """Builds a regex that only follows matching prefixes; longer words win over their prefixes."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        alternatives = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ""
+        pattern = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+        return f"(?:{pattern})?" if "" in node else pattern
+
+    return build(trie)
+
+
+#Function to build the name and code lookups plus the compiled regex
+def build_matcher():
+    import pycountry  # Loading its country database is only worth it once a description is matched
+
+    names = {}
+    for country in pycountry.countries:
+        for attribute in ("name", "official_name", "common_name"):
+            value = getattr(country, attribute, None)
+            if value:
+                names.setdefault(value.lower(), country.name)
+    for alias, name in ALIASES.items():
+        names.setdefault(alias.lower(), name)
+    for place in IGNORED:
+        names[place.lower()] = None
+
+    codes = {country.alpha_3: country.name for country in pycountry.countries if country.alpha_3 not in AMBIGUOUS_CODES}
+    codes.update(CODE_ALIASES)
+
+    regex = re.compile(
+        rf"(?<!\w)(?:(?P<name>(?i:{trie_pattern(names)}))|(?P<code>{trie_pattern(codes)}))(?!\w)"
+    )
+    return regex, names, codes
+
+
+#Function to find the countries mentioned in a text
+def find_countries(text):
+    """Returns pycountry names in order of first mention, without duplicates."""
+    global _matcher
+    if not text:
+        return []
+    if _matcher is None:
+        _matcher = build_matcher()
+    regex, names, codes = _matcher
+
+    found = {}
+    for match in regex.finditer(text):
+        if match.group("name"):
+            if not match.group("name")[0].isupper():
+                continue
+            name = names.get(match.group("name").lower())
+        else:
+            name = codes.get(match.group("code"))
+        if name:
+            found[name] = None
+    return list(found)
@@ -0,0 +1,52 @@
+# crawl_pool.py
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import metrics
+import rate_control
+
+logger = logging.getLogger(__name__)
+
+
+#Function to split work units into interleaved shards
+def make_shards(units, workers):
+    """Deals units round-robin so every worker stays near the front of the range."""
+    workers = max(1, min(workers, len(units)))
+    return [units[i::workers] for i in range(workers)]
+
+
+#Function to run one shard in a worker process and hand its metrics back with the result
+def _run_shard(shard_worker, shard, max_rate, *args):
+    metrics.reset()  # A forked worker starts with a copy of the parent's metrics
+    metrics.setup_logging()
+    rate_control.configure(max_rate)  # Each worker gets its share of the request-rate ceiling
+    return shard_worker(shard, *args), metrics.snapshot()
+
+
+#Function to run a shard worker over all units in separate processes
+def run_sharded(shard_worker, units, workers, *args):
+    """Runs `shard_worker(shard, *args)` once per shard; returns (merged results, failed units).
+
+    Each shard worker owns its own browser and returns {unit: result}; callers
+    rebuild the output in their own unit order so the merge is deterministic.
+    The units of a worker that crashed are returned as failed, so the caller
+    can retry them or mark the run incomplete.
+    """
+    units = list(units)
+    if workers <= 1 or len(units) <= 1:
+        return shard_worker(units, *args), []
+
+    shards = make_shards(units, workers)
+    max_rate = rate_control.max_rate() / len(shards)
+    results = {}
+    failed = []
+    with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+        futures = [executor.submit(_run_shard, shard_worker, shard, max_rate, *args) for shard in shards]
+        for shard, future in zip(shards, futures):
+            try:
+                shard_results, shard_metrics = future.result()
+                results.update(shard_results)
+                metrics.merge(shard_metrics)
+            except Exception as e:
+                logger.error(f"❌ Worker failed on shard {shard}: {e}")
+                failed.extend(shard)
+    return results, failed
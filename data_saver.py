@@ -1,13 +1,26 @@
+import logging
 import json
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import os
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+import time
+import random
+from functools import lru_cache
+from metrics import timed, count
+
+# gspread, oauth2client and googleapiclient are imported by the functions that
+# talk to Google, so commands that never do (e.g. offline re-parsing) start fast
+# and run without the service-account keyfile.
+
+logger = logging.getLogger(__name__)
 
 scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-creds = ServiceAccountCredentials.from_json_keyfile_name("savedata-452919-69fd401a8a6d.json", scope)
+KEYFILE_ENV = "NATRUE_GOOGLE_KEYFILE"
+KEYFILE = os.environ.get(KEYFILE_ENV) or "savedata-452919-69fd401a8a6d.json"
+
+SHEETS_CHUNK_SIZE = 500
+SHEETS_MAX_RETRIES = 5
+SHEETS_RETRY_STATUSES = (429, 500, 502, 503)
 
+@timed("save_to_json")
 def save_to_json(data, filename):
     os.makedirs("scraped_data", exist_ok=True)
     filepath = os.path.join("scraped_data", filename)
@@ -15,31 +28,50 @@ def save_to_json(data, filename):
     with open(filepath, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=4, ensure_ascii=False)
     
-    print(f"Data saved in '{filepath}'")
+    logger.info(f"Data saved in '{filepath}'")
 
 # def save_to_json(data, filename):
 #     with open(filename, "w", encoding="utf-8") as f:
 #         json.dump(data, f, indent=4, ensure_ascii=False)
 #     print(f"Data saved in '{filename}'")
 
+#Function to load the service-account credentials once, on first use
+@lru_cache(maxsize=None)
+def get_credentials():
+    from oauth2client.service_account import ServiceAccountCredentials
+
+    if not os.path.exists(KEYFILE):
+        raise FileNotFoundError(f"Google service-account keyfile '{KEYFILE}' not found (set {KEYFILE_ENV} to its path)")
+    return ServiceAccountCredentials.from_json_keyfile_name(KEYFILE, scope)
+
+def open_sheet(sheet_name):
+    """Returns the first worksheet of the named Google Sheet, or None if it does not exist."""
+    import gspread
+
+    client = gspread.authorize(get_credentials())
+
+    try:
+        return client.open(sheet_name).sheet1
+    except gspread.exceptions.SpreadsheetNotFound:
+        logger.warning(f"Google Sheet '{sheet_name}' not found.")
+        return None
+
+@timed("save_to_google_sheets")
 def save_to_google_sheets(data, headers, sheet_name):
 
     if not data:
-        print(" No data found to upload.")
+        logger.info(" No data found to upload.")
         return
-    client = gspread.authorize(creds)
 
-    try:
-        sheet = client.open(sheet_name).sheet1
-    except gspread.exceptions.SpreadsheetNotFound:
-        print(f"Google Sheet '{sheet_name}' not found.")
+    sheet = open_sheet(sheet_name)
+    if sheet is None:
         return
 
     sheet.clear()  
-    print(f"Cleared existing data in '{sheet_name}'.")
+    logger.debug(f"Cleared existing data in '{sheet_name}'.")
 
     sheet.append_row(headers)
-    print(f"Headers written: {headers}")
+    logger.debug(f"Headers written: {headers}")
 
     # Collect rows to insert in one go
     rows = []
@@ -49,9 +81,138 @@ def save_to_google_sheets(data, headers, sheet_name):
     
     if rows:
         sheet.insert_rows(rows, 2) 
-        print(f"{len(rows)} rows written to the sheet.")
+        logger.info(f"{len(rows)} rows written to the sheet.")
     
-    print(f"Data saved to Google Sheets: {sheet_name}")
+    logger.info(f"Data saved to Google Sheets: {sheet_name}")
+
+# Function to call the Sheets API, backing off on rate limits and transient errors
+def with_backoff(call, *args, **kwargs):
+    import gspread
+
+    for attempt in range(SHEETS_MAX_RETRIES + 1):
+        try:
+            return call(*args, **kwargs)
+        except gspread.exceptions.APIError as e:
+            if e.code not in SHEETS_RETRY_STATUSES or attempt == SHEETS_MAX_RETRIES:
+                raise
+            delay = min(64, 2 ** attempt) + random.uniform(0, 1)
+            count("sheets_retries")
+            logger.warning(f"Sheets API returned {e.code}, retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+# Function to turn a record value into the string a sheet cell reads back as
+def to_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    return str(value)
+
+# Function to split a list into chunks for batched API calls
+def chunked(items, size=SHEETS_CHUNK_SIZE):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+# Function to group row positions by their key column
+def group_by_key(rows, key_index):
+    groups = {}
+    for position, row in enumerate(rows):
+        groups.setdefault(row[key_index] if key_index < len(row) else "", []).append(position)
+    return groups
+
+# Function to compute row-level changes between the sheet and the new rows
+def diff_rows(current_rows, rows, headers, key_column):
+    """Returns (updates, inserts, deletes) for the data rows below the header.
+
+    updates is a list of (sheet row number, row), inserts a list of rows to
+    append, deletes a list of sheet row numbers. Rows sharing a key (e.g. two
+    products with the same name) are first matched to identical sheet rows, so
+    a reordered export changes nothing; the rest are paired in order. Row order
+    in the sheet is kept: new rows are appended at the end.
+    """
+    width = len(headers)
+    key_index = headers.index(key_column)
+    current_rows = [(row + [""] * width)[:width] for row in current_rows]
+
+    existing = group_by_key(current_rows, key_index)
+    updates, inserts, deletes = [], [], []
+    for key, positions in group_by_key(rows, key_index).items():
+        sheet_positions = existing.pop(key, [])
+        unmatched = []
+        for position in positions:
+            same = next((sheet for sheet in sheet_positions if current_rows[sheet] == rows[position]), None)
+            if same is None:
+                unmatched.append(position)
+            else:
+                sheet_positions.remove(same)
+        for position, sheet in zip(unmatched, sheet_positions):
+            updates.append((sheet + 2, rows[position]))  # +2: 1-based rows and the header row
+        inserts.extend(rows[position] for position in unmatched[len(sheet_positions):])
+        deletes.extend(sheet + 2 for sheet in sheet_positions[len(unmatched):])
+
+    for sheet_positions in existing.values():
+        deletes.extend(sheet + 2 for sheet in sheet_positions)
+    return sorted(updates), inserts, sorted(deletes)
+
+# Function to group row numbers into contiguous (start, end) blocks
+def row_blocks(row_numbers):
+    blocks = []
+    for number in row_numbers:
+        if blocks and blocks[-1][1] == number - 1:
+            blocks[-1][1] = number
+        else:
+            blocks.append([number, number])
+    return blocks
+
+# Function to sync rows into a Google Sheet with row-level inserts, updates and deletes
+@timed("save_to_google_sheets")
+def sync_rows_to_google_sheets(rows, headers, sheet_name, key_column="Name", sheet=None):
+    """Only changed rows are sent, in chunked batch calls. The sheet is read on every sync, so
+    rows edited or removed by hand are repaired, and an unchanged sheet gets no writes at all.
+    `sheet` can be any object with the gspread Worksheet methods used here (e.g. fake_sheet.FakeWorksheet).
+    """
+    if not rows:
+        logger.info(" No data found to upload.")
+        return
+
+    from gspread.utils import rowcol_to_a1
+
+    if sheet is None:
+        sheet = open_sheet(sheet_name)
+        if sheet is None:
+            # Raised rather than logged, so callers don't record the upload as done
+            raise RuntimeError(f"Google Sheet '{sheet_name}' not found.")
+
+    current = with_backoff(sheet.get_all_values)
+
+    if not current or current[0][:len(headers)] != headers:
+        # Unknown layout: rewrite the sheet once instead of diffing against it
+        with_backoff(sheet.clear)
+        for chunk in chunked([headers] + rows):
+            with_backoff(sheet.append_rows, chunk, value_input_option="RAW")
+        logger.info(f"Rewrote '{sheet_name}' with {len(rows)} rows.")
+    else:
+        updates, inserts, deletes = diff_rows(current[1:], rows, headers, key_column)
+
+        # Updates use the current row numbers, so they go before any delete shifts them
+        for chunk in chunked(updates):
+            with_backoff(sheet.batch_update, [
+                {"range": f"{rowcol_to_a1(number, 1)}:{rowcol_to_a1(number, len(headers))}", "values": [row]}
+                for number, row in chunk
+            ])
+        for start, end in reversed(row_blocks(deletes)):
+            with_backoff(sheet.delete_rows, start, end)
+        for chunk in chunked(inserts):
+            with_backoff(sheet.append_rows, chunk, value_input_option="RAW")
+
+        if updates or inserts or deletes:
+            logger.info(f"Synced '{sheet_name}': {len(inserts)} inserted, {len(updates)} updated, {len(deletes)} deleted.")
+        else:
+            logger.info(f"'{sheet_name}' is already up to date.")
+
+# Function to sync records into a Google Sheet (diff-based alternative to save_to_google_sheets)
+def sync_to_google_sheets(data, headers, sheet_name, key_column="Name", sheet=None):
+    rows = [[to_cell(item.get(col, "")) for col in headers] for item in data]
+    sync_rows_to_google_sheets(rows, headers, sheet_name, key_column, sheet)
 
 #  test with a smaller dataset
 # test_data = [{"name": "(4 ELEMENTS FOR LIFE)", "image": "https://example.com/image.jpg", "brand_description": "Some description"}]
@@ -59,18 +220,6 @@ def save_to_google_sheets(data, headers, sheet_name):
 
 def authenticate_drive():
     """Authenticate using the existing service account credentials"""
-    return build("drive", "v3", credentials=creds)
+    from googleapiclient.discovery import build
 
-def upload_to_drive(file_path, folder_id=None):
-    
-    drive_service = authenticate_drive()
-    
-    file_metadata = {"name": os.path.basename(file_path)}
-    if folder_id:
-        file_metadata["parents"] = [folder_id]  
-
-    media = MediaFileUpload(file_path, mimetype="application/msword")
-    uploaded_file = drive_service.files().create(body=file_metadata, media_body=media, fields="id").execute()
-    
-    print(f"Uploaded {file_path} to Google Drive with file ID: {uploaded_file.get('id')}")
-    return uploaded_file.get("id")
+    return build("drive", "v3", credentials=get_credentials())
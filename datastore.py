@@ -0,0 +1,248 @@
+# datastore.py
+# Indexed SQLite copy of the scraped products, brands and raw materials, with
+# FTS5 full-text indexes over product ingredients and material INCI names, so
+# consumers can query without loading the JSON files into memory.
+# Rebuild from the JSON files with: python datastore.py --load
+# Query with: python datastore.py --contains "Rosa Canina" / --brand Weleda
+import argparse
+import json
+import logging
+import os
+import sqlite3
+from delta import load_previous
+from metrics import setup_logging
+
+logger = logging.getLogger(__name__)
+
+DATABASE_FILE = os.path.join("scraped_data", "natrue.sqlite3")
+
+# Table -> record field -> column
+TABLES = {
+    "products": {
+        "Name": "name",
+        "Brand": "brand",
+        "Image URL": "image_url",
+        "Certification": "certification",
+        "Dialog Product": "dialog_product",
+        "Manufacturer": "manufacturer",
+        "Ingredients": "ingredients",
+        "Description": "description",
+        "Usage": "usage",
+    },
+    "brands": {
+        "Name": "name",
+        "Image URL": "image_url",
+        "Brand Description": "description",
+        "Countries": "countries",  # Stored as a JSON list
+    },
+    "raw_materials": {
+        "Name": "name",
+        "Manufacturer": "manufacturer",
+        "Composition": "composition",
+        "INCI": "inci",
+        "Status": "status",
+        "Expiration": "expiration",
+    },
+}
+
+# Table -> column indexed for full-text search
+FTS_COLUMNS = {"products": "ingredients", "raw_materials": "inci"}
+
+# Source JSON file of each table, for rebuilding the database offline
+JSON_FILES = {"products": "products.json", "brands": "Brands.json", "raw_materials": "raw_materials.json"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    name TEXT, brand TEXT, image_url TEXT, certification TEXT, dialog_product TEXT,
+    manufacturer TEXT, ingredients TEXT, description TEXT, usage TEXT
+);
+CREATE INDEX IF NOT EXISTS products_brand ON products (brand COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS products_manufacturer ON products (manufacturer COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS products_name ON products (name COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS brands (
+    id INTEGER PRIMARY KEY,
+    name TEXT, image_url TEXT, description TEXT, countries TEXT
+);
+CREATE INDEX IF NOT EXISTS brands_name ON brands (name COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS raw_materials (
+    id INTEGER PRIMARY KEY,
+    name TEXT, manufacturer TEXT, composition TEXT, inci TEXT, status TEXT, expiration TEXT
+);
+CREATE INDEX IF NOT EXISTS raw_materials_manufacturer ON raw_materials (manufacturer COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS raw_materials_name ON raw_materials (name COLLATE NOCASE);
+"""
+
+# External-content FTS5 tables stay in step with their table through triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5({column}, content='{table}', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+    INSERT INTO {table}_fts (rowid, {column}) VALUES (new.id, new.{column});
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+    INSERT INTO {table}_fts ({table}_fts, rowid, {column}) VALUES ('delete', old.id, old.{column});
+END;
+"""
+
+
+#Function to open the database, creating the tables and indexes on first use
+def connect(path=DATABASE_FILE, check_same_thread=True):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=check_same_thread)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA + "".join(
+        FTS_SCHEMA.format(table=table, column=column) for table, column in FTS_COLUMNS.items()
+    ))
+    return connection
+
+
+#Function to turn a scraped record into a table row
+def to_row(table, record):
+    row = []
+    for field in TABLES[table]:
+        value = record.get(field)
+        row.append(json.dumps(value, ensure_ascii=False) if isinstance(value, list) else value)
+    return row
+
+
+#Function to turn a table row back into a scraped record
+def to_record(table, row):
+    record = {field: row[column] for field, column in TABLES[table].items()}
+    if table == "brands":
+        record["Countries"] = json.loads(record["Countries"]) if record["Countries"] else []
+    return record
+
+
+#Function to build the INSERT statement of a table
+def insert_sql(table):
+    columns = TABLES[table].values()
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+
+
+class SqliteSink:
+    """Pipeline sink that replaces a table's rows with the records of this run.
+
+    Everything happens in one transaction, so an interrupted run leaves the
+    previous rows (and their search index) in place.
+    """
+
+    def __init__(self, table, path=DATABASE_FILE):
+        self.table = table
+        # Written from the pipeline's sink thread
+        self.connection = connect(path, check_same_thread=False)
+        self.sql = insert_sql(table)
+        self.count = 0
+
+    def write(self, record):
+        if not record:
+            return
+        if self.count == 0:
+            self.connection.execute("BEGIN")
+            self.connection.execute(f"DELETE FROM {self.table}")
+        self.connection.execute(self.sql, to_row(self.table, record))
+        self.count += 1
+
+    def close(self):
+        if self.count:
+            self.connection.commit()
+            logger.info(f"{self.count} rows stored in '{self.table}'")
+        self.connection.close()
+
+    def abort(self):
+        self.connection.rollback()
+        self.connection.close()
+
+
+#Function to quote a search term as an FTS5 phrase, so punctuation and keywords are matched literally
+def fts_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+class DataStore:
+    """Read-only queries over the scraped data; every result is a list of records like the JSON files."""
+
+    def __init__(self, path=DATABASE_FILE):
+        self.connection = connect(path)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _records(self, table, sql, params=()):
+        return [to_record(table, row) for row in self.connection.execute(sql, params)]
+
+    def _search(self, table, term, limit):
+        column = FTS_COLUMNS[table]
+        sql = (f"SELECT {table}.* FROM {table}_fts JOIN {table} ON {table}.id = {table}_fts.rowid "
+               f"WHERE {table}_fts MATCH ? ORDER BY {table}.id")
+        params = [f"{column} : {fts_phrase(term)}"]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._records(table, sql, params)
+
+    #Function to find the products whose ingredient list contains a phrase, e.g. "Rosa Canina"
+    def products_containing(self, ingredient, limit=None):
+        return self._search("products", ingredient, limit)
+
+    #Function to find the raw materials whose INCI contains a phrase
+    def materials_with_inci(self, inci, limit=None):
+        return self._search("raw_materials", inci, limit)
+
+    def products_of_brand(self, brand):
+        return self._records("products", "SELECT * FROM products WHERE brand = ? COLLATE NOCASE ORDER BY id", (brand,))
+
+    def products_of_manufacturer(self, manufacturer):
+        return self._records("products", "SELECT * FROM products WHERE manufacturer = ? COLLATE NOCASE ORDER BY id", (manufacturer,))
+
+    def materials_of_manufacturer(self, manufacturer):
+        return self._records("raw_materials", "SELECT * FROM raw_materials WHERE manufacturer = ? COLLATE NOCASE ORDER BY id", (manufacturer,))
+
+    def brand(self, name):
+        records = self._records("brands", "SELECT * FROM brands WHERE name = ? COLLATE NOCASE LIMIT 1", (name,))
+        return records[0] if records else None
+
+    #Function to stream a whole table in scrape order without loading it at once
+    def iter_records(self, table):
+        for row in self.connection.execute(f"SELECT * FROM {table} ORDER BY id"):
+            yield to_record(table, row)
+
+
+#Function to rebuild the database tables from the scraped JSON files
+def load_from_json(tables=JSON_FILES, path=DATABASE_FILE):
+    for table, filename in tables.items():
+        sink = SqliteSink(table, path)
+        for record in load_previous(filename):
+            sink.write(record)
+        sink.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the SQLite copy of the scraped data.")
+    parser.add_argument("--load", action="store_true", help="rebuild the tables from the JSON files in scraped_data")
+    parser.add_argument("--contains", help="list the products whose ingredients contain this phrase")
+    parser.add_argument("--inci", help="list the raw materials whose INCI contains this phrase")
+    parser.add_argument("--brand", help="list the products of a brand")
+    args = parser.parse_args()
+
+    setup_logging()
+    if args.load:
+        load_from_json()
+    with DataStore() as store:
+        results = []
+        if args.contains:
+            results = store.products_containing(args.contains)
+        elif args.inci:
+            results = store.materials_with_inci(args.inci)
+        elif args.brand:
+            results = store.products_of_brand(args.brand)
+        for record in results:
+            print(json.dumps(record, ensure_ascii=False))
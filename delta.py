@@ -0,0 +1,105 @@
+# delta.py
+# Reuses the previous run's pop-up details for listing cards that did not change.
+import logging
+import json
+import os
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+FULL_REFRESH_DAYS = 7
+STATE_FILE = os.path.join("scraped_data", "delta_state.json")
+
+
+#Function to build the fingerprint of a record from its listing-card fields
+def fingerprint(record, fields):
+    return tuple(record.get(field) for field in fields)
+
+
+#Function to load the previous run's records from scraped_data
+def load_previous(filename):
+    filepath = os.path.join("scraped_data", filename)
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+#Function to index previous records by card fingerprint
+def build_cache(previous, fingerprint_fields, derive=None):
+    """Maps each card fingerprint to the record scraped for it last time.
+
+    `derive` recomputes a record's derived fields (e.g. the countries parsed from
+    its description), so a fix to the parsing also reaches unchanged cards.
+    """
+    derive = derive or (lambda record: record)
+    return {fingerprint(record, fingerprint_fields): derive(record) for record in previous if record}
+
+
+#Function to read when a crawl last did a full refresh
+def load_state():
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+#Function to check whether a crawl is due for a forced full refresh
+def needs_full_refresh(crawl, days=FULL_REFRESH_DAYS):
+    last_full = load_state().get(crawl)
+    return not last_full or datetime.now() - datetime.fromisoformat(last_full) >= timedelta(days=days)
+
+
+#Function to record that a crawl just did a full refresh
+def mark_full_refresh(crawl):
+    state = load_state()
+    state[crawl] = datetime.now().isoformat(timespec="seconds")
+
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    with open(STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=4)
+
+
+class DeltaSink:
+    """Pipeline sink that counts added, changed, unchanged and removed items as records stream past.
+
+    A changed item keeps its key (e.g. name and brand) but has a new card fingerprint.
+    """
+
+    def __init__(self, crawl, previous, key_fields, fingerprint_fields):
+        self.crawl = crawl
+        self.key_fields = key_fields
+        self.fingerprint_fields = fingerprint_fields
+        self.previous_keys = {fingerprint(record, key_fields) for record in previous if record}
+        self.previous_prints = {fingerprint(record, fingerprint_fields) for record in previous if record}
+        self.current_keys = set()
+        self.report = {"added": 0, "changed": 0, "unchanged": 0, "removed": 0}
+
+    def write(self, record):
+        if not record:
+            return
+        key = fingerprint(record, self.key_fields)
+        self.current_keys.add(key)
+        if fingerprint(record, self.fingerprint_fields) in self.previous_prints:
+            self.report["unchanged"] += 1
+        elif key in self.previous_keys:
+            self.report["changed"] += 1
+        else:
+            self.report["added"] += 1
+
+    def close(self):
+        self.report["removed"] = len(self.previous_keys - self.current_keys)
+        print_delta_report(self.crawl, self.report)
+
+    def abort(self):
+        # Items an interrupted run never reached are not known to be removed
+        logger.warning(f"⚠️ {self.crawl}: run did not finish. So far {self.report['added']} added, "
+                       f"{self.report['changed']} changed, {self.report['unchanged']} unchanged")
+
+
+#Function to print a delta report
+def print_delta_report(crawl, report):
+    logger.info(f"🔁 {crawl}: {report['added']} added, {report['changed']} changed, "
+          f"{report['unchanged']} unchanged, {report['removed']} removed")
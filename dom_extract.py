@@ -0,0 +1,74 @@
+# dom_extract.py
+# Reads many fields in one WebDriver round trip by running a JavaScript snippet
+# over declarative field maps, instead of one find_element call per field.
+
+# Field maps: record field -> (CSS selector, "text" or the attribute/property to read)
+PRODUCT_CARD_FIELDS = {
+    "Name": (".product-list__item__name", "text"),
+    "Brand": (".product-list__item__brand", "text"),
+    "Image URL": ("img", "src"),
+}
+
+PRODUCT_DIALOG_FIELDS = {
+    "Certification": (".dialog-product__certification__level", "text"),
+    "Dialog Product": (".dialog-product__certification__description", "text"),
+    "Manufacturer": ("div[class='dialog-product__info__content']", "text"),
+    "Description": (".dialog-product__description", "text"),
+}
+
+BRAND_CARD_FIELDS = {
+    "Name": (".brand-list__item__name", "text"),
+    "Image URL": ("img", "src"),
+}
+
+BRAND_DIALOG_FIELDS = {
+    "Brand Description": (".dialog-brand__description", "text"),
+}
+
+# arguments[0]: field map; arguments[1]: a CSS selector for every root, an element, or null for the document.
+# Missing elements give null, like the NoSuchElementException fallbacks did.
+EXTRACT_FIELDS_JS = """
+const fields = arguments[0];
+const target = arguments[1];
+const roots = typeof target === "string" ? Array.from(document.querySelectorAll(target)) : [target || document];
+return roots.map(root => {
+    const record = {};
+    for (const [name, [selector, source]] of Object.entries(fields)) {
+        const element = root.querySelector(selector);
+        if (!element) {
+            record[name] = null;
+        } else if (source === "text") {
+            record[name] = element.innerText.trim();
+        } else {
+            record[name] = element[source] ?? element.getAttribute(source);
+        }
+    }
+    return record;
+});
+"""
+
+SCROLL_AND_CLICK_JS = "arguments[0].scrollIntoView({block: 'center'}); arguments[0].click();"
+
+# Page numbers shown by a listing's pager (Element UI renders "1 2 3 ... 58")
+PAGER_NUMBERS_JS = "return Array.from(document.querySelectorAll('ul.el-pager li.number'), li => li.textContent.trim());"
+
+
+#Function to read the fields of every element matching a selector in one call
+def extract_all(driver, root_selector, fields):
+    return driver.execute_script(EXTRACT_FIELDS_JS, fields, root_selector)
+
+
+#Function to read the fields under one element (or the whole document) in one call
+def extract_one(driver, fields, element=None):
+    return driver.execute_script(EXTRACT_FIELDS_JS, fields, element)[0]
+
+
+#Function to scroll an element into view and click it in one call
+def scroll_and_click(driver, element):
+    driver.execute_script(SCROLL_AND_CLICK_JS, element)
+
+
+#Function to read the highest page number the listing's pager shows; None if there is no pager
+def last_page_number(driver):
+    numbers = [int(text) for text in driver.execute_script(PAGER_NUMBERS_JS) or [] if text.isdigit()]
+    return max(numbers) if numbers else None
@@ -0,0 +1,167 @@
+# drive_sync.py
+# Mirrors local files into one Google Drive folder.
+# The folder is listed once per sync. A file whose name already exists there is
+# updated in place instead of uploaded again, a file whose MD5 matches Drive's
+# md5Checksum is skipped, and the rest go through a bounded pool of uploads.
+# Works against any object shaped like the Drive v3 service, e.g. fake_drive.FakeDrive.
+# Run with: python drive_sync.py <folder id> [material_docs] [--delete-duplicates]
+import argparse
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from data_saver import authenticate_drive
+from metrics import count, timed, setup_logging
+
+logger = logging.getLogger(__name__)
+
+DRIVE_UPLOAD_WORKERS = 4
+DRIVE_RETRIES = 5  # Passed to execute(); the client backs off on 429, 5xx and rate-limit 403s
+DRIVE_PAGE_SIZE = 1000
+DRIVE_BATCH_SIZE = 100  # Most calls one batch request may carry
+DOC_MIMETYPE = "application/msword"
+FILE_FIELDS = "id, name, md5Checksum"
+
+
+#Function to hash a local file the way Drive reports md5Checksum
+def file_md5(path):
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DriveSync:
+    """Uploads, updates or skips files so the folder ends up with one current copy of each.
+
+    `service` is used by every thread, so pass one only if it is thread-safe
+    (like the fake). Otherwise each upload thread builds its own Drive client
+    once and reuses it for all of its uploads.
+    """
+
+    def __init__(self, folder_id, service=None, workers=DRIVE_UPLOAD_WORKERS, mimetype=DOC_MIMETYPE):
+        self.folder_id = folder_id
+        self.shared_service = service
+        self.workers = workers
+        self.mimetype = mimetype
+        self.local = threading.local()
+        self.remote = None  # Name -> file of the folder listing
+        self.duplicates = []  # Older files that share a name with a newer one
+        self.stats = {"created": 0, "updated": 0, "unchanged": 0, "failed": 0}
+        self.lock = threading.Lock()
+
+    @property
+    def service(self):
+        if self.shared_service is not None:
+            return self.shared_service
+        if not hasattr(self.local, "service"):
+            self.local.service = authenticate_drive()
+        return self.local.service
+
+    #Function to list the folder once, newest file first for every name
+    def list_folder(self):
+        files = self.service.files()
+        query = f"'{self.folder_id}' in parents and trashed = false"
+        self.remote, self.duplicates = {}, []
+        page_token = None
+        while True:
+            response = files.list(q=query, fields=f"nextPageToken, files({FILE_FIELDS})", orderBy="modifiedTime desc",
+                                  pageSize=DRIVE_PAGE_SIZE, pageToken=page_token).execute(num_retries=DRIVE_RETRIES)
+            for file in response.get("files", []):
+                if file["name"] in self.remote:
+                    self.duplicates.append(file)
+                else:
+                    self.remote[file["name"]] = file
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        logger.info(f"Drive folder lists {len(self.remote)} files ({len(self.duplicates)} duplicates)")
+        return self.remote
+
+    def _record(self, outcome):
+        with self.lock:
+            self.stats[outcome] += 1
+
+    #Function to upload one file as a new Drive file or a new revision of the one with its name
+    @timed("upload_to_drive")
+    def upload(self, path):
+        from googleapiclient.http import MediaFileUpload
+
+        name = os.path.basename(path)
+        existing = self.remote.get(name)
+        try:
+            if existing and existing.get("md5Checksum") == file_md5(path):
+                self._record("unchanged")
+                count("drive_unchanged")
+                return existing["id"]
+
+            media = MediaFileUpload(path, mimetype=self.mimetype)
+            files = self.service.files()
+            if existing:
+                uploaded = files.update(fileId=existing["id"], media_body=media, fields=FILE_FIELDS).execute(num_retries=DRIVE_RETRIES)
+                self._record("updated")
+                count("drive_updates")
+            else:
+                body = {"name": name, "parents": [self.folder_id]}
+                uploaded = files.create(body=body, media_body=media, fields=FILE_FIELDS).execute(num_retries=DRIVE_RETRIES)
+                self._record("created")
+                count("drive_uploads")
+        except Exception as e:
+            logger.error(f"❌ Could not upload {path} to Google Drive: {e}")
+            self._record("failed")
+            return None
+
+        with self.lock:
+            self.remote[name] = uploaded
+        logger.debug(f"Uploaded {path} to Google Drive with file ID: {uploaded.get('id')}")
+        return uploaded.get("id")
+
+    #Function to make the folder hold the current version of every path; returns {path: file ID or None}
+    def sync(self, paths):
+        paths = list(dict.fromkeys(paths))
+        if self.remote is None:
+            self.list_folder()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            file_ids = dict(zip(paths, executor.map(self.upload, paths)))
+        logger.info(f"☁️ Drive sync: {self.stats['created']} uploaded, {self.stats['updated']} updated, "
+                    f"{self.stats['unchanged']} unchanged, {self.stats['failed']} failed")
+        return file_ids
+
+    #Function to delete the duplicates earlier runs left in the folder, in batched requests
+    def delete_duplicates(self):
+        if self.remote is None:
+            self.list_folder()
+        deleted = set()
+
+        def callback(request_id, response, exception):
+            if exception:
+                logger.warning(f"⚠️ Could not delete duplicate {request_id}: {exception}")
+            else:
+                deleted.add(request_id)
+
+        for start in range(0, len(self.duplicates), DRIVE_BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=callback)
+            for file in self.duplicates[start:start + DRIVE_BATCH_SIZE]:
+                batch.add(self.service.files().delete(fileId=file["id"]), request_id=file["id"])
+            batch.execute()
+
+        self.duplicates = [file for file in self.duplicates if file["id"] not in deleted]
+        count("drive_duplicates_deleted", len(deleted))
+        logger.info(f"🧹 Deleted {len(deleted)} duplicate files from Google Drive")
+        return len(deleted)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mirror a directory of generated documents into a Google Drive folder.")
+    parser.add_argument("folder_id", help="ID of the Drive folder")
+    parser.add_argument("directory", nargs="?", default="material_docs", help="local directory to upload (default: material_docs)")
+    parser.add_argument("--delete-duplicates", action="store_true", help="also delete older copies of a name left by earlier uploads")
+    args = parser.parse_args()
+
+    setup_logging()
+    drive_sync = DriveSync(args.folder_id)
+    drive_sync.sync(os.path.join(args.directory, name) for name in sorted(os.listdir(args.directory)))
+    if args.delete_duplicates:
+        drive_sync.delete_duplicates()
@@ -1,14 +1,241 @@
 # driver_setup.py
+import logging
+import json
+import os
+import time
+import threading
+from queue import Queue
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+logger = logging.getLogger(__name__)
+
+# Resolved chromedriver binary and the Chrome version it was resolved for
+DRIVER_MANIFEST = os.path.join(".driver_cache", "chromedriver.json")
+
+# Set to "1" (e.g. by `main.py --lean`) to make every setup_driver() call use the lean profile;
+# an environment variable also reaches the worker processes of a sharded crawl.
+LEAN_PROFILE_ENV = "NATRUE_LEAN_BROWSER"
+
+# Requests the lean profile drops: images, media, fonts and third-party trackers.
+# Stylesheets are kept because the dialog waits depend on computed visibility.
+BLOCKED_URL_PATTERNS = [
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.mp4", "*.webm", "*.mp3",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*facebook.com/tr*", "*hotjar.com*", "*cookiebot.com*",
+]
+
+#Function to read the local Chrome major version without touching the network
+def get_chrome_major_version():
+    # webdriver_manager is only imported once a browser is actually started
+    from webdriver_manager.core.os_manager import OperationSystemManager, ChromeType
+
+    version = OperationSystemManager().get_browser_version_from_os(ChromeType.GOOGLE)
+    return version.split(".")[0] if version else None
+
+#Function to resolve the chromedriver binary, reusing the cached one while Chrome's major version is unchanged
+def resolve_chromedriver():
+    try:
+        with open(DRIVER_MANIFEST, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    cached_path = manifest.get("driver_path")
+    cached_ok = bool(cached_path) and os.path.exists(cached_path)
+    chrome_version = get_chrome_major_version()
+
+    if cached_ok and (chrome_version is None or chrome_version == manifest.get("chrome_version")):
+        return cached_path
+
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        driver_path = ChromeDriverManager().install()
+    except Exception as e:
+        if cached_ok:
+            logger.warning(f"⚠️ Could not resolve chromedriver ({e}). Using cached {cached_path}")
+            return cached_path
+        raise
+
+    os.makedirs(os.path.dirname(DRIVER_MANIFEST), exist_ok=True)
+    with open(DRIVER_MANIFEST, "w", encoding="utf-8") as f:
+        json.dump({"driver_path": driver_path, "chrome_version": chrome_version}, f, indent=4)
+    return driver_path
+
+def setup_driver(lean=None):
+    if lean is None:
+        lean = os.environ.get(LEAN_PROFILE_ENV) == "1"
 
-def setup_driver():
     chrome_options = Options()
     chrome_options.add_argument("--headless")
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--no-sandbox")
 
-    service = Service(ChromeDriverManager().install())
-    return webdriver.Chrome(service=service, options=chrome_options)
\ No newline at end of file
+    if lean:
+        # We only read text and the img src attribute, so skip everything else
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--disable-background-networking")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+        })
+        chrome_options.page_load_strategy = "eager"
+
+    service = Service(resolve_chromedriver())
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+
+    driver.lean_profile = lean  # Extra tabs (see prefetch.py) need the same request blocking
+    if lean:
+        block_heavy_requests(driver)
+
+    return driver
+
+#Function to block media, fonts and trackers in the current tab (URL blocking is set per tab)
+def block_heavy_requests(driver):
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+
+class DriverPool:
+    """Keeps pre-started browsers warm and hands the same sessions out again after release.
+
+    Browsers start in background threads, so Chrome launches while other work
+    (e.g. the HTTP fast path) is running.
+    """
+
+    def __init__(self, size=1, lean=None):
+        self.size = size
+        self.lean = lean
+        self.pid = os.getpid()
+        self.started = time.perf_counter()
+        self.ready = Queue()
+        self.drivers = []
+        self.first_navigation_reported = False
+        for _ in range(size):
+            self._start_one()
+
+    def _start_one(self):
+        def start():
+            try:
+                driver = setup_driver(self.lean)
+            except Exception as e:
+                self.ready.put(e)
+                return
+            self.drivers.append(driver)
+            self.ready.put(driver)
+        threading.Thread(target=start, daemon=True).start()
+
+    def acquire(self):
+        driver = self.ready.get()
+        if isinstance(driver, Exception):
+            self.ready.put(driver)  # Every other waiter gets the same error instead of blocking forever
+            raise driver
+        if not self.first_navigation_reported:
+            self._report_first_navigation(driver)
+        return driver
+
+    def release(self, driver):
+        # A browser that crashed or lost its session is replaced rather than handed out again
+        try:
+            driver.current_url
+        except Exception as e:
+            logger.warning(f"⚠️ Pooled browser is no longer responding ({type(e).__name__}), starting a new one.")
+            self.drivers.remove(driver)
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            self._start_one()
+            return
+        self.ready.put(driver)
+
+    def _report_first_navigation(self, driver):
+        self.first_navigation_reported = True
+        navigate = driver.get
+
+        def get(url):
+            navigate(url)
+            logger.info(f"⏱️ Time to first navigation: {time.perf_counter() - self.started:.2f}s")
+            driver.get = navigate  # Only the first navigation is timed
+        driver.get = get
+
+    def close(self):
+        for driver in self.drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        self.drivers = []
+
+_pool = None
+
+#Function to start a shared pool of warm browsers for this process
+def start_driver_pool(size=1, lean=None):
+    global _pool
+    _pool = DriverPool(size, lean)
+    return _pool
+
+#Function to stop the shared pool and quit its browsers
+def stop_driver_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+#Function to get a browser: a warm pooled one if a pool runs in this process, else a new one
+def acquire_driver():
+    # Forked worker processes inherit the pool object but must not share its sessions
+    if _pool is not None and _pool.pid == os.getpid():
+        return _pool.acquire()
+    return setup_driver()
+
+#Function to hand a browser back: pooled ones are kept for the next tab, others quit
+def release_driver(driver):
+    if _pool is not None and _pool.pid == os.getpid() and driver in _pool.drivers:
+        _pool.release(driver)
+    else:
+        driver.quit()
+
+# Sum of bytes fetched by the current page (navigation plus resources)
+TRANSFER_SIZE_JS = """
+return performance.getEntriesByType("navigation").concat(performance.getEntriesByType("resource"))
+    .reduce((total, entry) => total + (entry.transferSize || 0), 0);
+"""
+
+#Function to compare page-ready latency and bytes transferred for the full and lean profiles
+def measure_profiles(pages, timeout=30):
+    """`pages` is a list of (url, CSS selector that marks the page as ready)."""
+    results = {}
+    for profile, lean in (("full", False), ("lean", True)):
+        driver = setup_driver(lean=lean)
+        try:
+            results[profile] = []
+            for url, ready_selector in pages:
+                start = time.perf_counter()
+                driver.get(url)
+                WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.CSS_SELECTOR, ready_selector)))
+                results[profile].append({
+                    "url": url,
+                    "seconds": time.perf_counter() - start,
+                    "bytes": driver.execute_script(TRANSFER_SIZE_JS),
+                })
+        finally:
+            driver.quit()
+
+    for full, lean in zip(results["full"], results["lean"]):
+        print(f"{full['url']}\n  full: {full['seconds']:.2f}s {full['bytes'] / 1024:.0f} KiB"
+              f" | lean: {lean['seconds']:.2f}s {lean['bytes'] / 1024:.0f} KiB")
+    return results
+
+if __name__ == "__main__":
+    base_url = "https://natrue.org/our-standard/natrue-certified-world/?database[tab]="
+    measure_profiles([
+        (base_url + "products", ".product-list__item"),
+        (base_url + "brands", ".brand-list__item"),
+        (base_url + "raw-materials", "button"),
+    ])
@@ -0,0 +1,136 @@
+# fake_drive.py
+# In-memory stand-in for the parts of the Google Drive v3 service that
+# drive_sync.py uses: files().list/create/update/delete, execute() and batch
+# requests. It keeps file contents and counts every call, so a sync can be
+# checked (and benchmarked) without credentials or network access.
+import hashlib
+import itertools
+import re
+import threading
+import time
+from collections import Counter
+
+PARENT_QUERY = re.compile(r"'([^']+)' in parents")
+
+
+class FakeRequest:
+    def __init__(self, drive, method, func):
+        self.drive = drive
+        self.method = method
+        self.func = func
+
+    def execute(self, num_retries=0, http=None):
+        time.sleep(self.drive.latency)
+        with self.drive.lock:
+            self.drive.calls[self.method] += 1
+            return self.func()
+
+
+class FakeBatch:
+    def __init__(self, drive, callback=None):
+        self.drive = drive
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        self.requests.append((request, callback or self.callback, request_id or str(len(self.requests) + 1)))
+
+    def execute(self):
+        time.sleep(self.drive.latency)
+        with self.drive.lock:
+            self.drive.calls["batch"] += 1
+        for request, callback, request_id in self.requests:
+            try:
+                with self.drive.lock:
+                    self.drive.calls[request.method] += 1
+                    response, exception = request.func(), None
+            except Exception as e:
+                response, exception = None, e
+            if callback:
+                callback(request_id, response, exception)
+
+
+class FakeFiles:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def list(self, q="", fields=None, orderBy=None, pageSize=100, pageToken=None, **kwargs):
+        def run():
+            match = PARENT_QUERY.search(q or "")
+            files = [file for file in self.drive.files_by_id.values() if not match or match.group(1) in file["parents"]]
+            if orderBy == "modifiedTime desc":
+                files.sort(key=lambda file: -file["modifiedTime"])
+            start = int(pageToken or 0)
+            response = {"files": [self.drive.describe(file) for file in files[start:start + pageSize]]}
+            if start + pageSize < len(files):
+                response["nextPageToken"] = str(start + pageSize)
+            return response
+        return FakeRequest(self.drive, "list", run)
+
+    def create(self, body, media_body=None, fields=None, **kwargs):
+        def run():
+            return self.drive.describe(self.drive.add_file(body["name"], read_media(media_body), *body.get("parents", [])))
+        return FakeRequest(self.drive, "create", run)
+
+    def update(self, fileId, body=None, media_body=None, fields=None, **kwargs):
+        def run():
+            file = self.drive.files_by_id[fileId]
+            if media_body is not None:
+                self.drive.write(file, read_media(media_body))
+            file.update(body or {})
+            return self.drive.describe(file)
+        return FakeRequest(self.drive, "update", run)
+
+    def delete(self, fileId, **kwargs):
+        def run():
+            del self.drive.files_by_id[fileId]
+            return ""
+        return FakeRequest(self.drive, "delete", run)
+
+
+#Function to read the bytes of a MediaFileUpload (or any media object with size/getbytes)
+def read_media(media):
+    return media.getbytes(0, media.size()) if media is not None else b""
+
+
+class FakeDrive:
+    """Thread-safe fake Drive service; `calls` counts executed requests per method.
+
+    `latency` (seconds) delays every request, batch requests once for the whole batch.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.lock = threading.RLock()
+        self.files_by_id = {}
+        self.calls = Counter()
+        self.ids = itertools.count(1)
+        self.clock = itertools.count(1)  # Stands in for modifiedTime
+
+    def files(self):
+        return FakeFiles(self)
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+    def write(self, file, content):
+        file["content"] = content
+        file["md5Checksum"] = hashlib.md5(content).hexdigest()
+        file["modifiedTime"] = next(self.clock)
+
+    #Function to put a file straight into the fake (e.g. to seed duplicates left by earlier runs)
+    def add_file(self, name, content, parent=None):
+        with self.lock:
+            file = {"id": f"fake-{next(self.ids)}", "name": name, "parents": [parent] if parent else []}
+            self.write(file, content)
+            self.files_by_id[file["id"]] = file
+            return file
+
+    @staticmethod
+    def describe(file):
+        return {"id": file["id"], "name": file["name"], "md5Checksum": file["md5Checksum"]}
+
+    #Function to list the names of a folder, with one entry per copy
+    def names(self, parent):
+        with self.lock:
+            return sorted(file["name"] for file in self.files_by_id.values() if parent in file["parents"])
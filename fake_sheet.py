@@ -0,0 +1,86 @@
+# fake_sheet.py
+# In-memory stand-in for the parts of a gspread Worksheet that
+# data_saver.sync_rows_to_google_sheets and pipeline.SheetsSink use:
+# get_all_values, clear, append_row(s), batch_update and delete_rows.
+# It keeps the cells as strings (what a RAW write reads back as) and counts
+# every call, so a sync can be checked and benchmarked without credentials.
+import re
+import threading
+import time
+from collections import Counter
+
+A1_RANGE = re.compile(r"^([A-Z]+)(\d+):([A-Z]+)(\d+)$")
+
+
+#Function to turn a column's letters into its 1-based number, e.g. "AB" -> 28
+def column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord("A") + 1
+    return number
+
+
+class FakeWorksheet:
+    """Thread-safe fake worksheet; `rows` holds the cells, header row included.
+
+    `latency` (seconds) delays every call, like one round trip to the Sheets API.
+    """
+
+    def __init__(self, rows=None, latency=0.0):
+        self.rows = [[str(cell) for cell in row] for row in rows or []]
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.calls = Counter()
+
+    def _call(self, method):
+        time.sleep(self.latency)
+        self.calls[method] += 1
+
+    def get_all_values(self):
+        with self.lock:
+            self._call("get_all_values")
+            return [list(row) for row in self.rows]
+
+    def clear(self):
+        with self.lock:
+            self._call("clear")
+            self.rows = []
+
+    def append_row(self, values, value_input_option="RAW"):
+        self.append_rows([values], value_input_option)
+
+    def append_rows(self, values, value_input_option="RAW"):
+        with self.lock:
+            self._call("append_rows")
+            self.rows.extend([to_cell(cell) for cell in row] for row in values)
+
+    def batch_update(self, data, **kwargs):
+        with self.lock:
+            self._call("batch_update")
+            for update in data:
+                first_col, first_row, _, _ = self._parse_range(update["range"])
+                for offset, values in enumerate(update["values"]):
+                    number = first_row + offset
+                    while len(self.rows) < number:
+                        self.rows.append([])
+                    row = self.rows[number - 1]
+                    row.extend([""] * (first_col - 1 + len(values) - len(row)))
+                    row[first_col - 1:first_col - 1 + len(values)] = [to_cell(cell) for cell in values]
+
+    def delete_rows(self, start_index, end_index=None):
+        with self.lock:
+            self._call("delete_rows")
+            del self.rows[start_index - 1:(end_index or start_index)]
+
+    @staticmethod
+    def _parse_range(a1_range):
+        match = A1_RANGE.match(a1_range)
+        if not match:
+            raise ValueError(f"Unsupported range: {a1_range}")
+        first_col, first_row, last_col, last_row = match.groups()
+        return column_number(first_col), int(first_row), column_number(last_col), int(last_row)
+
+
+#Function to store a value the way a RAW write reads back
+def to_cell(value):
+    return "" if value is None else str(value)
@@ -0,0 +1,96 @@
+# fast_path.py
+# Fetches listing and detail payloads straight from the NATRUE database backend,
+# skipping the browser. The scrapers fall back to Selenium when this fails.
+# Opt-in (`main.py --fast-path`): the endpoints below are not a published API.
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import timed
+from rate_control import TransientError, request, retry
+
+# The endpoints are configuration rather than a documented API, so they can be
+# pointed at a local server that replays recorded payloads.
+API_BASE_URL = "https://natrue.org/wp-json/natrue/v1/database"
+REQUEST_TIMEOUT = 10
+# Statuses that mean "slow down and try again" rather than "this URL is wrong"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FastPathError(Exception):
+    """Raised when the backend cannot be reached or returns an unexpected payload."""
+
+
+#Function to create a pooled HTTP session
+def create_session(pool_size=10):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Accept": "application/json"})
+    return session
+
+
+#Function to read a Retry-After header given in seconds
+def retry_after(response):
+    value = response.headers.get("Retry-After", "")
+    return float(value) if value.isdigit() else None
+
+
+#Function to send one GET through the shared rate controller
+def send_get(session, url, params=None, headers=None):
+    """Returns the response; timeouts and throttling/server-error statuses raise TransientError."""
+    with request():
+        try:
+            response = session.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise TransientError(f"{url}: {e}") from e
+        if response.status_code in RETRY_STATUSES:
+            raise TransientError(f"{url}: HTTP {response.status_code}", retry_after(response))
+    return response
+
+
+#Function to GET a URL and decode its JSON body
+@timed("http_get")
+def get_json(session, url, params=None):
+    try:
+        response = retry(send_get, session, url, params)
+        response.raise_for_status()
+        return response.json()
+    except (TransientError, requests.RequestException, ValueError) as e:
+        raise FastPathError(f"{url}: {e}") from e
+
+
+#Function to read a dotted path such as "brand.name" from a payload
+def get_field(payload, path):
+    value = payload
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+#Function to fetch the items of one listing page for a tab
+def fetch_listing(session, tab, params, api_base_url=API_BASE_URL):
+    """Returns the list of listing items; an empty list means past the last page."""
+    payload = get_json(session, f"{api_base_url}/{tab}", params)
+    items = payload.get("data") if isinstance(payload, dict) else None
+    if not isinstance(items, list):
+        raise FastPathError(f"Unexpected listing payload for {tab} {params}")
+    return items
+
+
+#Function to fetch the detail (pop-up) payload of one item
+def fetch_detail(session, tab, item_id, api_base_url=API_BASE_URL):
+    payload = get_json(session, f"{api_base_url}/{tab}/{item_id}")
+    detail = payload.get("data") if isinstance(payload, dict) else None
+    if not isinstance(detail, dict):
+        raise FastPathError(f"Unexpected detail payload for {tab} {item_id}")
+    return detail
+
+
+#Function to fetch the detail payloads of a listing page over the pooled session
+def fetch_details(session, tab, items, api_base_url=API_BASE_URL, workers=8):
+    """Returns the detail payloads in the same order as the listing items."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda item: fetch_detail(session, tab, item.get("id"), api_base_url), items))
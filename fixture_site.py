@@ -0,0 +1,315 @@
+# fixture_site.py
+# A local stand-in for the NATRUE certified-world database, served from the
+# checked-in scraped_data files and the recorded raw-materials export, so the
+# scrapers can be exercised and benchmarked without hitting natrue.org.
+# Run with: python fixture_site.py --port 8000 --latency 0.2
+import argparse
+import html
+import json
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from sections import join_sections
+
+PRODUCTS_FILE = os.path.join("scraped_data", "products.json")
+BRANDS_FILE = os.path.join("scraped_data", "Brands.json")
+EXPORT_FILE = os.path.join("downloads", "raw_materials_2025-03-07.xlsx")
+
+SITE_PATH = "/our-standard/natrue-certified-world/"
+API_PATH = "/wp-json/natrue/v1/database"
+PRODUCT_PAGE_SIZE = 20
+BRAND_PAGE_SIZE = 12
+
+# 1x1 transparent GIF served for every card image, with fixed validators for revalidation
+PIXEL_GIF = bytes.fromhex("47494638396101000100800000000000ffffff21f90401000000002c00000000010001000002024401003b")
+PIXEL_ETAG = '"pixel-1"'
+PIXEL_LAST_MODIFIED = "Mon, 03 Mar 2025 00:00:00 GMT"
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>NATRUE fixture: {tab}</title>
+<style>
+.dialog {{ display: none; position: fixed; top: 10%; left: 10%; right: 10%; background: #fff; border: 1px solid #333; }}
+.dialog.open {{ display: block; }}
+.dialog-product__description, .dialog-brand__description {{ white-space: pre-line; }}
+</style></head>
+<body>
+{body}
+<script>
+const DETAILS = {details};
+const DIALOG_DELAY = {dialog_delay};
+const dialog = document.querySelector(".dialog");
+document.querySelectorAll("[data-index]").forEach(card => card.addEventListener("click", () => {{
+    // The real dialogs animate in, so the content shows up after a delay
+    setTimeout(() => {{
+        for (const [selector, text] of Object.entries(DETAILS[card.dataset.index])) {{
+            dialog.querySelector(selector).textContent = text;
+        }}
+        dialog.classList.add("open");
+    }}, DIALOG_DELAY);
+}}));
+document.addEventListener("keydown", event => {{
+    if (event.key === "Escape") dialog.classList.remove("open");
+}});
+document.querySelectorAll("button[data-export]").forEach(button => button.addEventListener("click", () => {{
+    window.location.href = button.dataset.export;
+}}));
+</script>
+</body></html>
+"""
+
+
+#Function to escape text for HTML
+def esc(value):
+    return html.escape(value or "")
+
+
+#Function to load a JSON list, or an empty list if the file is missing
+def load_records(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [record for record in json.load(f) if record]
+    except (OSError, ValueError):
+        return []
+
+
+#Function to file a brand under its letter filter (A-Z, everything else under '#')
+def brand_letter(brand):
+    first = (brand.get("Name") or "#").strip()[:1].upper()
+    return first if "A" <= first <= "Z" else "#"
+
+
+#Function to render the page numbers of a listing like Element UI's el-pager
+def render_pager(pages, current=1, pager_count=7):
+    """Long listings show the first and last page and a window around the current one, with "more" gaps."""
+    if pages <= pager_count:
+        numbers = list(range(1, pages + 1))
+    else:
+        side = (pager_count - 3) // 2
+        start = min(max(2, current - side), pages - pager_count + 2)
+        numbers = [1] + list(range(start, start + pager_count - 2)) + [pages]
+    items = []
+    for previous, page in zip([0] + numbers, numbers):
+        if page - previous > 1:
+            items.append('<li class="more btn-quicknext"></li>')
+        items.append(f'<li class="number{" active" if page == current else ""}">{page}</li>')
+    return '<ul class="el-pager">' + "".join(items) + "</ul>"
+
+
+class FixtureSite:
+    """Serves recorded products, brands and the raw-materials export over HTTP.
+
+    `latency` (seconds) delays every page, API and export response; `dialog_delay`
+    (seconds) delays each pop-up after its card is clicked.
+    """
+
+    def __init__(self, latency=0.0, dialog_delay=0.0, product_page_size=PRODUCT_PAGE_SIZE,
+                 brand_page_size=BRAND_PAGE_SIZE, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.dialog_delay = dialog_delay
+        self.product_page_size = product_page_size
+        self.brand_page_size = brand_page_size
+        self.products = load_records(PRODUCTS_FILE)
+        self.brands = load_records(BRANDS_FILE)
+        # Letter -> [(brand id, brand)]
+        self.brands_by_letter = {}
+        for index, brand in enumerate(self.brands):
+            self.brands_by_letter.setdefault(brand_letter(brand), []).append((index, brand))
+
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                site.handle(self)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.image_requests = 0
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_base_url(self):
+        return self.url + API_PATH
+
+    #Function to build the listing URL of a tab, in the same form the scrapers use
+    def tab_url(self, tab):
+        return f"{self.url}{SITE_PATH}?database[tab]={tab}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    #Function to page through a list of (id, record) pairs (pages start at 1)
+    @staticmethod
+    def page_of(records, page, size):
+        start = (page - 1) * size
+        return records[start:start + size] if page >= 1 else []
+
+    def image_url(self, kind, index):
+        return f"{self.url}/img/{kind}/{index}.gif?v=1"
+
+    def handle(self, request):
+        parsed = urlparse(request.path)
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+
+        if parsed.path.startswith("/img/"):
+            return self.send_image(request)
+
+        time.sleep(self.latency)
+        if parsed.path == "/export.xlsx":
+            return self.send_export(request)
+        if parsed.path.startswith(API_PATH):
+            return self.send_api(request, parsed.path[len(API_PATH):].strip("/").split("/"), query)
+        if parsed.path.rstrip("/") == SITE_PATH.rstrip("/"):
+            return self.send_page(request, query)
+        self.send(request, b"Not found", "text/plain", status=404)
+
+    def send(self, request, body, content_type, status=200, headers=None):
+        request.send_response(status)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(body)
+
+    def send_image(self, request):
+        self.image_requests += 1
+        if request.headers.get("If-None-Match") == PIXEL_ETAG or request.headers.get("If-Modified-Since") == PIXEL_LAST_MODIFIED:
+            request.send_response(304)
+            request.send_header("ETag", PIXEL_ETAG)
+            request.end_headers()
+            return
+        self.send(request, PIXEL_GIF, "image/gif", headers={"ETag": PIXEL_ETAG, "Last-Modified": PIXEL_LAST_MODIFIED})
+
+    def send_export(self, request):
+        with open(EXPORT_FILE, "rb") as f:
+            body = f.read()
+        self.send(request, body, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                  headers={"Content-Disposition": f'attachment; filename="{os.path.basename(EXPORT_FILE)}"'})
+
+    def send_page(self, request, query):
+        tab = query.get("database[tab]", "products")
+        if tab == "products":
+            body, details = self.render_products(int(query.get("prod[pageIndex]") or 1))
+        elif tab == "brands":
+            letter = query.get("brands[filters][letter]", "A")
+            body, details = self.render_brands(letter, int(query.get("brands[pageNumber]") or 1))
+        else:
+            body = '<div class="raw-materials"><button data-export="/export.xlsx">Export</button></div><div class="dialog"></div>'
+            details = []
+
+        # "</" would end the script block early
+        details_json = json.dumps(details, ensure_ascii=False).replace("</", "<\\/")
+        page = PAGE_TEMPLATE.format(tab=esc(tab), body=body, details=details_json, dialog_delay=int(self.dialog_delay * 1000))
+        self.send(request, page.encode("utf-8"), "text/html; charset=utf-8")
+
+    def render_products(self, page):
+        cards, details = [], []
+        for position, (index, product) in enumerate(self.page_of(list(enumerate(self.products)), page, self.product_page_size)):
+            cards.append(
+                f'<div class="product-list__item" data-index="{position}"><img src="{self.image_url("products", index)}">'
+                f'<div class="product-list__item__name">{esc(product.get("Name"))}</div>'
+                f'<div class="product-list__item__brand">{esc(product.get("Brand"))}</div></div>'
+            )
+            details.append({
+                ".dialog-product__certification__level": product.get("Certification") or "",
+                ".dialog-product__certification__description": product.get("Dialog Product") or "",
+                "div[class='dialog-product__info__content']": product.get("Manufacturer") or "",
+                ".dialog-product__description": join_sections(product),
+            })
+
+        dialog = (
+            '<div class="dialog dialog-product">'
+            '<div class="dialog-product__certification__level"></div>'
+            '<div class="dialog-product__certification__description"></div>'
+            '<div class="dialog-product__info__content"></div>'
+            '<div class="dialog-product__description"></div></div>'
+        )
+        pages = -(-len(self.products) // self.product_page_size)
+        return '<div class="product-list">' + "".join(cards) + "</div>" + render_pager(pages, page) + dialog, details
+
+    def render_brands(self, letter, page):
+        brands = self.brands_by_letter.get(letter, [])
+        cards, details = [], []
+        for position, (index, brand) in enumerate(self.page_of(brands, page, self.brand_page_size)):
+            cards.append(
+                f'<div class="brand-list__item" data-index="{position}"><img src="{self.image_url("brands", index)}">'
+                f'<div class="brand-list__item__name">{esc(brand.get("Name"))}</div></div>'
+            )
+            details.append({".dialog-brand__description": brand.get("Brand Description") or ""})
+
+        pages = -(-len(brands) // self.brand_page_size)
+        dialog = '<div class="dialog dialog-brand"><div class="dialog-brand__description"></div></div>'
+        return '<div class="brand-list">' + "".join(cards) + "</div>" + render_pager(pages, page) + dialog, details
+
+    #Function to answer the JSON endpoints the HTTP fast path reads
+    def send_api(self, request, parts, query):
+        if parts == ["products"]:
+            page = self.page_of(list(enumerate(self.products)), int(query.get("pageIndex") or 1), self.product_page_size)
+            data = [self.product_payload(index, product, detail=False) for index, product in page]
+        elif parts[0] == "products" and len(parts) == 2 and parts[1].isdigit() and int(parts[1]) < len(self.products):
+            data = self.product_payload(int(parts[1]), self.products[int(parts[1])], detail=True)
+        elif parts == ["brands"]:
+            brands = self.brands_by_letter.get(query.get("letter", "A"), [])
+            page = self.page_of(brands, int(query.get("pageNumber") or 1), self.brand_page_size)
+            data = [self.brand_payload(index, brand, detail=False) for index, brand in page]
+        elif parts[0] == "brands" and len(parts) == 2 and parts[1].isdigit() and int(parts[1]) < len(self.brands):
+            data = self.brand_payload(int(parts[1]), self.brands[int(parts[1])], detail=True)
+        else:
+            return self.send(request, b'{"data": null}', "application/json", status=404)
+        self.send(request, json.dumps({"data": data}, ensure_ascii=False).encode("utf-8"), "application/json")
+
+    def product_payload(self, index, product, detail):
+        payload = {
+            "id": index,
+            "name": product.get("Name"),
+            "brand": {"name": product.get("Brand")},
+            "image": {"thumb": self.image_url("products", index)},
+        }
+        if detail:
+            payload["certification"] = {"level": product.get("Certification"), "description": product.get("Dialog Product")}
+            payload["manufacturer"] = product.get("Manufacturer")
+            payload["description"] = join_sections(product)
+        return payload
+
+    def brand_payload(self, index, brand, detail):
+        payload = {"id": index, "name": brand.get("Name"), "image": {"thumb": self.image_url("brands", index)}}
+        if detail:
+            payload["description"] = brand.get("Brand Description")
+        return payload
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local stand-in NATRUE site from the recorded data.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every page, API and export response")
+    parser.add_argument("--dialog-delay", type=float, default=0.0, help="seconds before a pop-up opens after a click")
+    args = parser.parse_args()
+
+    site = FixtureSite(args.latency, args.dialog_delay, port=args.port).start()
+    print(f"🌐 Fixture site running at {site.tab_url('products')}")
+    print(f"   HTTP fast path: {site.api_base_url}")
+    try:
+        site.thread.join()
+    except KeyboardInterrupt:
+        site.stop()
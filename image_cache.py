@@ -0,0 +1,152 @@
+# image_cache.py
+# Optional stage that downloads product and brand thumbnails into a
+# content-addressed cache (scraped_data/images/<sha256[:2]>/<sha256><ext>).
+# A URL whose `?v=` cache-buster was seen before is never requested again;
+# other known URLs are revalidated with If-None-Match / If-Modified-Since.
+# Run with: python image_cache.py
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+import requests
+from fast_path import create_session, send_get
+from rate_control import TransientError, retry
+from delta import load_previous
+from metrics import count, setup_logging
+
+logger = logging.getLogger(__name__)
+
+IMAGE_DIR = os.path.join("scraped_data", "images")
+INDEX_FILE = "index.json"
+IMAGE_CONCURRENCY = 8
+IMAGE_SOURCES = ("products.json", "Brands.json")
+
+
+#Function to split a URL into the address of the image and its `v` cache-buster
+def split_version(url):
+    parts = urlsplit(url)
+    version = parse_qs(parts.query).get("v", [None])[0]
+    return f"{parts.scheme}://{parts.netloc}{parts.path}", version
+
+
+class ImageCache:
+    """Downloads images concurrently over one pooled session, storing each distinct content once.
+
+    The index maps every URL to its content hash, file and HTTP validators.
+    """
+
+    def __init__(self, directory=IMAGE_DIR, session=None, concurrency=IMAGE_CONCURRENCY):
+        self.directory = directory
+        self.concurrency = concurrency
+        self.session = session or create_session(pool_size=concurrency)
+        self.session.headers.update({"Accept": "image/*"})
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.lock = threading.Lock()
+        self.stats = {"fresh": 0, "revalidated": 0, "downloaded": 0, "failed": 0}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+        # Latest entry per image address, so a new `?v=` can still be revalidated against the old copy
+        self.by_address = {split_version(url)[0]: entry for url, entry in self.index.items()}
+
+    #Function to give the cached file of a URL, or None
+    def path_for(self, url):
+        entry = self.index.get(url)
+        return os.path.join(self.directory, entry["file"]) if entry else None
+
+    def _has_file(self, entry):
+        return entry is not None and os.path.exists(os.path.join(self.directory, entry["file"]))
+
+    def _record(self, url, entry, outcome):
+        with self.lock:
+            self.index[url] = entry
+            self.by_address[split_version(url)[0]] = entry
+            self.stats[outcome] += 1
+        count(f"images_{outcome}")
+
+    #Function to store downloaded bytes under their content hash
+    def _store(self, content, url):
+        digest = hashlib.sha256(content).hexdigest()
+        extension = os.path.splitext(urlsplit(url).path)[1].lower() or ".img"
+        file = os.path.join(digest[:2], digest + extension)
+        path = os.path.join(self.directory, file)
+        if not os.path.exists(path):  # Identical images are stored once
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        return {"sha256": digest, "file": file}
+
+    #Function to make sure one image is cached; returns its file path or None
+    def fetch(self, url):
+        if not url:
+            return None
+
+        address, version = split_version(url)
+        entry = self.index.get(url)
+        if version and self._has_file(entry):
+            # Same cache-buster as before: the content cannot have changed
+            self._record(url, entry, "fresh")
+            return self.path_for(url)
+
+        previous = entry if self._has_file(entry) else self.by_address.get(address)
+        headers = {}
+        if self._has_file(previous):
+            if previous.get("etag"):
+                headers["If-None-Match"] = previous["etag"]
+            if previous.get("last_modified"):
+                headers["If-Modified-Since"] = previous["last_modified"]
+
+        try:
+            response = retry(send_get, self.session, url, headers=headers)
+            if response.status_code == 304 and headers:
+                self._record(url, dict(previous), "revalidated")
+                return self.path_for(url)
+            response.raise_for_status()
+        except (TransientError, requests.RequestException) as e:
+            logger.warning(f"⚠️ Could not fetch image {url}: {e}")
+            with self.lock:
+                self.stats["failed"] += 1
+            count("images_failed")
+            return None
+
+        entry = self._store(response.content, url)
+        entry["etag"] = response.headers.get("ETag")
+        entry["last_modified"] = response.headers.get("Last-Modified")
+        self._record(url, entry, "downloaded")
+        return self.path_for(url)
+
+    #Function to cache many images with at most `concurrency` requests in flight
+    def fetch_all(self, urls):
+        urls = list(dict.fromkeys(url for url in urls if url))
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            paths = dict(zip(urls, executor.map(self.fetch, urls)))
+        self.save_index()
+        logger.info(f"🖼️ Images: {self.stats['downloaded']} downloaded, {self.stats['revalidated']} revalidated, "
+                    f"{self.stats['fresh']} already cached, {self.stats['failed']} failed")
+        return paths
+
+    def save_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with self.lock:
+            data = json.dumps(self.index, indent=4, sort_keys=True)
+        with open(self.index_path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(self.index_path + ".tmp", self.index_path)
+
+
+#Function to cache the thumbnails of the scraped products and brands
+def cache_images(sources=IMAGE_SOURCES, directory=IMAGE_DIR, concurrency=IMAGE_CONCURRENCY):
+    urls = [record.get("Image URL") for filename in sources for record in load_previous(filename) if record]
+    return ImageCache(directory, concurrency=concurrency).fetch_all(urls)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    cache_images()
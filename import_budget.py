@@ -0,0 +1,75 @@
+# import_budget.py
+# Keeps CLI startup fast: runs each entry point under `python -X importtime` in
+# a fresh interpreter, checks the total import time against a budget and makes
+# sure the heavy libraries (Selenium, the Google clients, openpyxl...) are only
+# imported by the commands that use them.
+# Run with: python import_budget.py   (exits with 1 if a budget is exceeded)
+import argparse
+import re
+import subprocess
+import sys
+
+# Libraries that each cost 150-300 ms to import
+HEAVY_MODULES = ("selenium", "webdriver_manager", "gspread", "googleapiclient", "oauth2client", "openpyxl", "pycountry", "requests", "pandas", "numpy")
+
+# Name -> (code run in the child interpreter, budget in milliseconds)
+CHECKS = {
+    "main.py --help": ("import sys; sys.argv = ['main.py', '--help']; import runpy; runpy.run_path('main.py', run_name='__main__')", 150),
+    "main": ("import main", 150),
+    "task2": ("import task2", 150),
+    "sections": ("import sections", 150),
+    "datastore": ("import datastore", 150),
+    "raw_materials": ("import raw_materials", 200),
+    "drive_sync": ("import drive_sync", 150),
+}
+
+# Module names an -X importtime line reports, e.g. "import time:  1234 |  5678 | selenium.webdriver"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+#Function to import `code` in a fresh interpreter; returns (cumulative ms of top-level imports, modules imported)
+def measure(code):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    total_us, modules = 0, set()
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, module = int(match.group(2)), match.group(3), match.group(4)
+        modules.add(module)
+        if len(indent) == 1:
+            total_us += cumulative  # Nested imports are already part of their parent's cumulative time
+    return total_us / 1000, modules
+
+
+#Function to give the heavy libraries among the imported modules
+def heavy_imports(modules):
+    return sorted({module.split(".")[0] for module in modules} & set(HEAVY_MODULES))
+
+
+def check_budgets(scale=1.0, repeat=3):
+    """The best of `repeat` runs is compared, so a busy machine doesn't fail the check; `scale` loosens every budget."""
+    failures = []
+    for name, (code, budget_ms) in CHECKS.items():
+        runs = [measure(code) for _ in range(repeat)]
+        elapsed_ms = min(total for total, _ in runs)
+        heavy = heavy_imports(runs[0][1])
+        ok = elapsed_ms <= budget_ms * scale and not heavy
+        print(f"{'ok  ' if ok else 'FAIL'} {name}: {elapsed_ms:.0f} ms (budget {budget_ms * scale:.0f} ms)"
+              + (f", imports {', '.join(heavy)}" if heavy else ""))
+        if not ok:
+            failures.append(name)
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the import time of the CLI entry points.")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget, e.g. 2 on a slow CI machine")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per entry point; the fastest is compared to the budget")
+    args = parser.parse_args()
+
+    failures = check_budgets(args.scale, args.repeat)
+    if failures:
+        print(f"{len(failures)} of {len(CHECKS)} entry points over budget: {', '.join(failures)}")
+        sys.exit(1)
+    print("All entry points within their import budget")
@@ -0,0 +1,79 @@
+from collections import deque
+
+
+#Function to split a material INCI field into lowercase search terms
+def inci_terms(material_inci):
+    """Returns the lowercase INCI lines used for substring matching."""
+    if not material_inci:
+        return []
+    return [inci.strip().lower() for inci in material_inci.split("\n")]
+
+
+class InciMatcher:
+    """Aho-Corasick automaton over the INCI lines of every material.
+
+    Built once from the materials list; `match` scans a product's ingredient
+    string a single time and returns the indices of all materials with at
+    least one INCI line contained in it (same rules as a per-material
+    `inci in ingredients.lower()` check).
+    """
+
+    def __init__(self, materials):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [set()]
+        # An empty INCI line is a substring of any text, so those materials match every product
+        self.always = set()
+
+        for index, material in enumerate(materials):
+            if not material:
+                continue
+            for term in inci_terms(material.get("INCI")):
+                if term:
+                    self._add(term, index)
+                else:
+                    self.always.add(index)
+
+        self._build_links()
+
+    def _add(self, term, index):
+        node = 0
+        for char in term:
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][char] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(set())
+            node = next_node
+        self.output[node].add(index)
+
+    def _build_links(self):
+        # Children of the root fail back to the root; deeper nodes follow their parent's links
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(char, 0)
+                self.output[child] |= self.output[self.fail[child]]
+
+    def match(self, product_ingredients):
+        """Returns the set of material indices used in the given ingredients text."""
+        if not product_ingredients:
+            return set()
+
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set(self.always)
+        node = 0
+        for char in product_ingredients.lower():
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found |= output[node]
+        return found
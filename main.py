@@ -1,12 +1,164 @@
-from brand import brand_scraping
-from products import products_scraping
-from raw_materials import raw_materials_scraping
+# main.py
+# Command-line entry point with one subcommand per tab and per post-processing
+# step. Every command imports what it needs when it runs, so e.g. `docs` or
+# `raw-materials --convert --offline` never load Selenium, the Google client
+# libraries or the service-account keyfile.
+# Run everything with: python main.py   (same as `python main.py all`)
+import argparse
+import os
+from metrics import setup_logging
 
-def main():
-    products_scraping()
-    brand_scraping()
-    raw_materials_scraping()
+# Environment variables the scrape options set; they also reach sharded worker processes
+# (kept in sync with driver_setup.LEAN_PROFILE_ENV and prefetch.PREFETCH_ENV)
+LEAN_PROFILE_ENV = "NATRUE_LEAN_BROWSER"
+PREFETCH_ENV = "NATRUE_PREFETCH"
+
+
+#Function to run scrapers in one warm browser session and report where the time went
+def run_scrapers(steps):
+    from driver_setup import start_driver_pool, stop_driver_pool
+    from metrics import log_summary, save_metrics, save_prometheus
+
+    # Chrome starts in the background (while the HTTP fast path runs, if enabled),
+    # and the same session then serves all three tabs
+    start_driver_pool()
+    try:
+        for step in steps:
+            step()
+    finally:
+        stop_driver_pool()
+        # Where the time went: navigation, pop-ups, extraction, Sheets and Drive
+        log_summary()
+        save_metrics()
+        save_prometheus()
+
+
+def scrape_products(workers=1, use_fast_path=False, resume=False, full_refresh=False):
+    from products import products_scraping
+    products_scraping(workers=workers, use_fast_path=use_fast_path, resume=resume, full_refresh=full_refresh)
+
+
+def scrape_brands(workers=1, use_fast_path=False, resume=False, full_refresh=False):
+    from brand import brand_scraping
+    brand_scraping(workers=workers, use_fast_path=use_fast_path, resume=resume, full_refresh=full_refresh)
+
+
+def scrape_raw_materials(resume=False):
+    from raw_materials import raw_materials_scraping
+    raw_materials_scraping(resume=resume)
+
+
+def download_images():
+    from image_cache import cache_images
+    cache_images()
+
+
+def main(workers=1, use_fast_path=False, resume=False, full_refresh=False, images=False):
+    options = {"workers": workers, "use_fast_path": use_fast_path, "resume": resume, "full_refresh": full_refresh}
+    steps = [
+        lambda: scrape_products(**options),
+        lambda: scrape_brands(**options),
+        lambda: scrape_raw_materials(resume=resume),
+    ]
+    if images:
+        steps.append(download_images)
+    run_scrapers(steps)
+
+
+def command_all(args):
+    main(args.workers, args.fast_path, args.resume, args.full_refresh, args.images)
+
+
+def command_products(args):
+    run_scrapers([lambda: scrape_products(args.workers, args.fast_path, args.resume, args.full_refresh)])
+
+
+def command_brands(args):
+    run_scrapers([lambda: scrape_brands(args.workers, args.fast_path, args.resume, args.full_refresh)])
+
+
+def command_raw_materials(args):
+    if args.convert is None:
+        run_scrapers([lambda: scrape_raw_materials(args.resume)])
+        return
+
+    # Re-parse an export that is already on disk, without a browser
+    from raw_materials import convert_and_save_file
+    convert_and_save_file(args.convert or None, upload=not args.offline)
+
+
+def command_images(args):
+    download_images()
+
+
+def command_docs(args):
+    import task2
+    task2.main(args.output_dir, args.drive_folder)
+
+
+def command_sections(args):
+    from sections import rederive_sections
+    rederive_sections(args.file)
+
+
+def command_store(args):
+    from datastore import load_from_json
+    load_from_json()
+
+
+#Function to add the options shared by the scraping commands
+def add_scrape_options(parser, suppress=False):
+    """On subcommands the defaults are suppressed, so options given before the subcommand are kept."""
+    default = (lambda value: argparse.SUPPRESS) if suppress else (lambda value: value)
+    parser.add_argument("--workers", type=int, default=default(1), help="number of headless browsers for the products and brands crawls")
+    parser.add_argument("--fast-path", action="store_true", default=default(False), help="try the guessed JSON endpoints before the browser (unverified against the live site; falls back to the browser)")
+    parser.add_argument("--resume", action="store_true", default=default(False), help="skip pages, letters and items finished by an interrupted run")
+    parser.add_argument("--full-refresh", action="store_true", default=default(False), help="open every pop-up instead of reusing details of unchanged cards")
+    parser.add_argument("--lean", action="store_true", default=default(False), help="block images, media, fonts and trackers in the scraping browsers")
+    parser.add_argument("--prefetch", action="store_true", default=default(False), help="load the next listing page in a background tab while the current page's pop-ups are read")
+    parser.add_argument("--max-rate", type=float, default=default(None), help="ceiling on requests per second to the NATRUE site, shared by all workers (default: $NATRUE_MAX_RATE or 10)")
+    parser.add_argument("--log-level", default=default(None), help="DEBUG, INFO, WARNING or ERROR (default: $NATRUE_LOG_LEVEL or INFO)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Scrape NATRUE products, brands and raw materials, and post-process the results.")
+    add_scrape_options(parser)
+    parser.add_argument("--images", action="store_true", help="also download product and brand thumbnails into scraped_data/images")
+    parser.set_defaults(handler=command_all)
+    commands = parser.add_subparsers(title="commands", metavar="COMMAND")
+
+    def add_command(name, handler, help):
+        command = commands.add_parser(name, help=help, description=help)
+        add_scrape_options(command, suppress=True)
+        command.set_defaults(handler=handler)
+        return command
+
+    add_command("all", command_all, "scrape products, brands and raw materials (the default)").add_argument(
+        "--images", action="store_true", default=argparse.SUPPRESS, help="also download the thumbnails")
+    add_command("products", command_products, "scrape the products tab")
+    add_command("brands", command_brands, "scrape the brands tab")
+    raw = add_command("raw-materials", command_raw_materials, "download and convert the raw-materials export")
+    raw.add_argument("--convert", nargs="?", const="", metavar="XLSX",
+                     help="only convert an export already on disk (default: the newest file in downloads/)")
+    raw.add_argument("--offline", action="store_true", help="with --convert, write the local files only and skip Google Sheets")
+    add_command("images", command_images, "download product and brand thumbnails into scraped_data/images")
+    docs = add_command("docs", command_docs, "generate the material documents (task 2)")
+    docs.add_argument("--output-dir", default="material_docs")
+    docs.add_argument("--drive-folder", help="Google Drive folder to sync the documents into (default: no upload)")
+    sections = add_command("sections", command_sections, "re-derive Ingredients/Description/Usage of a scraped file offline")
+    sections.add_argument("--file", default="products.json", help="file in scraped_data (default: products.json)")
+    add_command("store", command_store, "rebuild scraped_data/natrue.sqlite3 from the JSON files")
+    return parser
 
 
 if __name__ == "__main__":
-    main()
+    args = build_parser().parse_args()
+    setup_logging(args.log_level)
+    if args.max_rate is not None:
+        from rate_control import configure
+        configure(args.max_rate)
+    if args.lean:
+        os.environ[LEAN_PROFILE_ENV] = "1"
+    if args.prefetch:
+        os.environ[PREFETCH_ENV] = "1"
+    args.handler(args)
@@ -0,0 +1,181 @@
+# materials_frame.py
+# Columnar in-memory model of the raw-materials export. The repetitive
+# Manufacturer, Composition, Status and INCI columns are pandas categoricals
+# (one small integer code per row), Expiration is parsed once into datetime64,
+# and every INCI field is split into its ingredients once, so queries are
+# vectorised comparisons on integer codes instead of loops over dicts.
+# Run with: python materials_frame.py --manufacturer "Symrise AG" --expiring 90
+import argparse
+import logging
+from datetime import date
+import numpy as np
+import pandas as pd
+from delta import load_previous
+from metrics import setup_logging
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("Name", "Manufacturer", "Composition", "INCI", "Status", "Expiration")
+CATEGORY_COLUMNS = ("Manufacturer", "Composition", "INCI", "Status")
+KEY_COLUMNS = ("Name", "Manufacturer")  # Identify a material across two exports
+DATE_FORMAT = "%d/%m/%Y"
+INCI_SEPARATORS = r"[,\n]"
+
+
+class RawMaterials:
+    """Raw materials as columns; every query returns another RawMaterials, so they can be chained.
+
+    `lowered` holds each categorical column's categories in lowercase, and `components`/`owners`
+    map each INCI ingredient to the INCI categories that contain it. A subset shares them with
+    the model it came from, since slicing keeps the categories.
+    """
+
+    def __init__(self, frame, lowered=None, components=None, owners=None):
+        self.frame = frame
+        if lowered is None:
+            lowered = {column: frame[column].cat.categories.str.lower() for column in CATEGORY_COLUMNS}
+            components, owners = self._split_inci(lowered["INCI"])
+        self.lowered = lowered
+        self.components = components
+        self.owners = owners
+
+    @classmethod
+    def from_records(cls, records):
+        frame = pd.DataFrame.from_records([record for record in records if record], columns=list(COLUMNS))
+        frame["Name"] = frame["Name"].str.strip()
+        for column in CATEGORY_COLUMNS:
+            frame[column] = frame[column].astype("category")
+        frame["Expiration"] = pd.to_datetime(frame["Expiration"], format=DATE_FORMAT, errors="coerce")
+        return cls(frame)
+
+    #Function to build the model from a converted export in scraped_data
+    @classmethod
+    def from_json(cls, filename="raw_materials.json"):
+        return cls.from_records(load_previous(filename))
+
+    #Function to build the model straight from a downloaded .xlsx export
+    @classmethod
+    def from_xlsx(cls, path):
+        from raw_materials import iter_xlsx_records
+        return cls.from_records(iter_xlsx_records(path))
+
+    @staticmethod
+    def _split_inci(categories):
+        parts = pd.Series(categories, dtype=object).str.split(INCI_SEPARATORS, regex=True).explode().str.strip()
+        parts = parts[parts.notna() & (parts != "")]
+        components = pd.Categorical(parts.to_numpy(dtype=object))
+        return components, parts.index.to_numpy()
+
+    def __len__(self):
+        return len(self.frame)
+
+    def _subset(self, mask):
+        return RawMaterials(self.frame[mask], self.lowered, self.components, self.owners)
+
+    #Function to match a categorical column through its categories: one test per distinct value, then a code lookup
+    def _category_mask(self, column, matches):
+        codes = np.flatnonzero(matches(self.lowered[column]))
+        return np.isin(self.frame[column].cat.codes.to_numpy(), codes)
+
+    def by_manufacturer(self, manufacturer):
+        manufacturer = manufacturer.strip().lower()
+        return self._subset(self._category_mask("Manufacturer", lambda names: names == manufacturer))
+
+    def by_status(self, status):
+        status = status.strip().lower()
+        return self._subset(self._category_mask("Status", lambda statuses: statuses == status))
+
+    #Function to find the materials with an INCI ingredient, e.g. "glycerin"; `contains` also matches inside longer names
+    def by_inci(self, inci, contains=False):
+        inci = inci.strip().lower()
+        if contains:
+            matching = np.flatnonzero(self.components.categories.str.contains(inci, regex=False))
+        else:
+            matching = [self.components.categories.get_loc(inci)] if inci in self.components.categories else []
+        owners = self.owners[np.isin(self.components.codes, matching)]
+        return self._subset(np.isin(self.frame["INCI"].cat.codes.to_numpy(), owners))
+
+    #Function to find the materials whose certificate expires in the next `days` days (today included)
+    def expiring_within(self, days, today=None):
+        start = pd.Timestamp(today or date.today())
+        expiration = self.frame["Expiration"]
+        return self._subset((expiration >= start) & (expiration <= start + pd.Timedelta(days=days)))
+
+    #Function to compare with a newer export; returns added and removed materials and the changed values
+    def diff(self, newer):
+        """Materials are matched on Name and Manufacturer. `changed` has one row per changed value:
+        Name, Manufacturer, Column, Old and New."""
+        old_keys, new_keys = self._keys(), newer._keys()
+        positions = new_keys.get_indexer(old_keys)  # Row of each old material in the newer export, -1 if gone
+        kept = positions >= 0
+        before, after = self.frame[kept], newer.frame.iloc[positions[kept]]
+
+        changes = []
+        for column in COLUMNS:
+            if column in KEY_COLUMNS:
+                continue
+            # Category sets differ between exports, so the values are compared as plain objects
+            old_values, new_values = before[column].to_numpy(dtype=object), after[column].to_numpy(dtype=object)
+            old_missing, new_missing = pd.isna(old_values), pd.isna(new_values)
+            differs = (old_missing != new_missing) | (~old_missing & ~new_missing & (old_values != new_values))
+            if differs.any():
+                rows = before[differs]
+                changes.append(pd.DataFrame({"Name": rows["Name"].to_numpy(dtype=object), "Manufacturer": rows["Manufacturer"].to_numpy(dtype=object),
+                                             "Column": column, "Old": old_values[differs], "New": new_values[differs]}))
+
+        return {
+            "added": newer._subset(old_keys.get_indexer(new_keys) < 0),
+            "removed": self._subset(~kept),
+            "changed": pd.concat(changes, ignore_index=True) if changes else pd.DataFrame(columns=[*KEY_COLUMNS, "Column", "Old", "New"]),
+        }
+
+    #Function to give one key per row; repeated Name/Manufacturer pairs are told apart by their order in the export
+    def _keys(self):
+        keys = self.frame["Name"].astype(object) + "\x1f" + self.frame["Manufacturer"].astype(object).fillna("")
+        repeated = keys.duplicated()
+        if repeated.any():
+            # The first occurrence keeps the plain key, so it still matches an export without repeats
+            keys[repeated] = keys[repeated] + "\x1f" + keys.groupby(keys).cumcount()[repeated].astype(str)
+        return pd.Index(keys.to_numpy(dtype=object))
+
+    #Function to convert back to records shaped like the JSON export
+    def records(self):
+        frame = self.frame.astype({column: object for column in CATEGORY_COLUMNS})
+        frame["Expiration"] = self.frame["Expiration"].dt.strftime(DATE_FORMAT).astype(object)
+        frame = frame.astype(object).where(frame.notna(), None)
+        return frame.to_dict("records")
+
+    #Function to give the bytes held by the columns and the INCI ingredient index
+    def memory_usage(self):
+        return int(self.frame.memory_usage(deep=True).sum() + self.components.memory_usage(deep=True) + self.owners.nbytes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the raw-materials export.")
+    parser.add_argument("--file", default="raw_materials.json", help="converted export in scraped_data (default: raw_materials.json)")
+    parser.add_argument("--manufacturer")
+    parser.add_argument("--status", help="approved or certified")
+    parser.add_argument("--inci", help="an INCI ingredient, e.g. Glycerin")
+    parser.add_argument("--expiring", type=int, metavar="DAYS", help="only materials expiring in the next DAYS days")
+    parser.add_argument("--diff", metavar="NEWER", help="compare with a newer converted export in scraped_data instead")
+    args = parser.parse_args()
+
+    setup_logging()
+    materials = RawMaterials.from_json(args.file)
+    logger.info(f"Loaded {len(materials)} raw materials ({materials.memory_usage() / 1024:.0f} KiB)")
+    if args.diff:
+        changes = materials.diff(RawMaterials.from_json(args.diff))
+        logger.info(f"{len(changes['added'])} added, {len(changes['removed'])} removed, {len(changes['changed'])} values changed")
+        print(changes["changed"].to_string(index=False))
+    else:
+        if args.manufacturer:
+            materials = materials.by_manufacturer(args.manufacturer)
+        if args.status:
+            materials = materials.by_status(args.status)
+        if args.inci:
+            materials = materials.by_inci(args.inci)
+        if args.expiring is not None:
+            materials = materials.expiring_within(args.expiring)
+        for record in materials.records():
+            print(f"{record['Name']} | {record['Manufacturer']} | {record['Status']} | {record['Expiration']}")
+        logger.info(f"{len(materials)} raw materials match")
@@ -0,0 +1,169 @@
+# metrics.py
+# Per-phase timers and counters for the scrapers, and the structured log setup.
+# Timings answer "where did the run spend its time" (navigation, pop-ups,
+# extraction, Sheets, Drive); they are summarised at the end of a run and
+# saved as JSON and in the Prometheus textfile format.
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+METRICS_FILE = os.path.join("scraped_data", "metrics.json")
+PROMETHEUS_FILE = os.path.join("scraped_data", "metrics.prom")
+LOG_LEVEL_ENV = "NATRUE_LOG_LEVEL"
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_timers = {}  # Phase -> [count, total seconds, max seconds]
+_counters = defaultdict(int)
+
+# Attributes every LogRecord has; anything else was passed with `extra=` and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class LogfmtFormatter(logging.Formatter):
+    """Formats records as `ts=... level=... logger=... msg="..." key=value` lines."""
+
+    def format(self, record):
+        fields = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        line = " ".join(f"{key}={self.quote(value)}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+    @staticmethod
+    def quote(value):
+        text = str(value)
+        return json.dumps(text, ensure_ascii=False) if not text or any(char in text for char in ' "=\n') else text
+
+
+#Function to send the scrapers' logs to stderr at the given (or NATRUE_LOG_LEVEL) level
+def setup_logging(level=None):
+    level = (level or os.environ.get(LOG_LEVEL_ENV) or "INFO").upper()
+    root = logging.getLogger()
+    if not any(isinstance(handler.formatter, LogfmtFormatter) for handler in root.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(LogfmtFormatter())
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+#Function to add to a counter
+def count(name, value=1):
+    with _lock:
+        _counters[name] += value
+
+
+#Function to add one timing to a phase
+def observe(phase, seconds):
+    with _lock:
+        timer = _timers.setdefault(phase, [0, 0.0, 0.0])
+        timer[0] += 1
+        timer[1] += seconds
+        timer[2] = max(timer[2], seconds)
+
+
+#Context manager to time a block as one occurrence of a phase
+@contextmanager
+def timer(phase):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(phase, time.perf_counter() - start)
+
+
+#Decorator to time every call of a function as a phase
+def timed(phase):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+#Function to clear all timers and counters
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+#Function to take a picklable copy of the metrics (e.g. to send them back from a worker process)
+def snapshot():
+    with _lock:
+        return {"timers": {phase: list(values) for phase, values in _timers.items()}, "counters": dict(_counters)}
+
+
+#Function to fold a worker's snapshot into this process's metrics
+def merge(other):
+    with _lock:
+        for phase, (calls, total, longest) in other["timers"].items():
+            timer = _timers.setdefault(phase, [0, 0.0, 0.0])
+            timer[0] += calls
+            timer[1] += total
+            timer[2] = max(timer[2], longest)
+        for name, value in other["counters"].items():
+            _counters[name] += value
+
+
+#Function to summarise the phases (slowest first) and counters
+def summary():
+    data = snapshot()
+    timers = {
+        phase: {"count": calls, "total": round(total, 3), "mean": round(total / calls, 4), "max": round(longest, 3)}
+        for phase, (calls, total, longest) in sorted(data["timers"].items(), key=lambda item: -item[1][1])
+    }
+    return {"timers": timers, "counters": dict(sorted(data["counters"].items()))}
+
+
+#Function to log the end-of-run summary
+def log_summary():
+    data = summary()
+    logger.info("📊 Run summary")
+    for phase, stats in data["timers"].items():
+        logger.info(f"  {phase}: {stats['count']} x, {stats['total']:.2f}s total, {stats['mean']:.3f}s mean, {stats['max']:.2f}s max",
+                    extra={"phase": phase, "seconds": stats["total"], "calls": stats["count"]})
+    for name, value in data["counters"].items():
+        logger.info(f"  {name}: {value}", extra={"counter": name, "value": value})
+
+
+#Function to save the summary as JSON
+def save_metrics(path=METRICS_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary(), f, indent=4)
+    logger.info(f"Metrics saved in '{path}'")
+
+
+#Function to save the metrics in the Prometheus textfile-collector format
+def save_prometheus(path=PROMETHEUS_FILE):
+    data = snapshot()
+    lines = [
+        "# HELP natrue_phase_seconds_total Time spent per scraper phase.",
+        "# TYPE natrue_phase_seconds_total counter",
+    ]
+    lines += [f'natrue_phase_seconds_total{{phase="{phase}"}} {total:.6f}' for phase, (_, total, _) in data["timers"].items()]
+    lines += ["# HELP natrue_phase_calls_total Occurrences per scraper phase.", "# TYPE natrue_phase_calls_total counter"]
+    lines += [f'natrue_phase_calls_total{{phase="{phase}"}} {calls}' for phase, (calls, _, _) in data["timers"].items()]
+    lines += ["# HELP natrue_events_total Scraper event counters.", "# TYPE natrue_events_total counter"]
+    lines += [f'natrue_events_total{{event="{name}"}} {value}' for name, value in data["counters"].items()]
+
+    # Written next to the target and renamed so the collector never reads a half-written file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(path + ".tmp", path)
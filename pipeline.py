@@ -0,0 +1,207 @@
+# pipeline.py
+# Streams scraped records into several sinks at once, each running in its own
+# thread, so output is written while the browser is still working.
+import logging
+import json
+import os
+import queue
+import threading
+from data_saver import open_sheet, to_cell, sync_rows_to_google_sheets
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+SHEETS_BATCH_SIZE = 200
+QUEUE_SIZE = 1000
+_DONE = object()
+_ABORT = object()
+
+
+class IncompleteRun(Exception):
+    """Raised by a record generator after its last record when part of the input could not be scraped.
+
+    run_pipeline then aborts the sinks as on any other error, so the JSON file,
+    the database and the sheet keep the last complete run instead of dropping
+    the missing pages' rows. A --resume run reuses the checkpointed pages and
+    retries only the missing ones.
+    """
+
+
+class JsonlSink:
+    """Writes one JSON record per line and flushes it right away.
+
+    The file is rewritten on every run, --resume included: a resumed run
+    replays the checkpointed records through the pipeline before the new ones,
+    so appending would write the finished pages twice.
+    """
+
+    def __init__(self, filename):
+        os.makedirs("scraped_data", exist_ok=True)
+        self.filepath = os.path.join("scraped_data", filename)
+        self.file = open(self.filepath, "w", encoding="utf-8")  # Truncates on purpose, see above
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+        logger.info(f"Data streamed to '{self.filepath}'")
+
+
+class JsonSink:
+    """Writes the same pretty-printed JSON list as save_to_json, one record at a time.
+
+    Records go to a temporary file that replaces the real one on close, so an
+    interrupted run leaves the previous output in place.
+    """
+
+    def __init__(self, filename):
+        os.makedirs("scraped_data", exist_ok=True)
+        self.filepath = os.path.join("scraped_data", filename)
+        self.file = open(self.filepath + ".tmp", "w", encoding="utf-8")
+        self.count = 0
+
+    @timed("save_to_json")
+    def write(self, record):
+        body = json.dumps(record, indent=4, ensure_ascii=False).replace("\n", "\n    ")
+        self.file.write(("[\n    " if self.count == 0 else ",\n    ") + body)
+        self.count += 1
+
+    def close(self):
+        self.file.write("\n]" if self.count else "[]")
+        self.file.close()
+        os.replace(self.filepath + ".tmp", self.filepath)
+        logger.info(f"Data saved in '{self.filepath}'")
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.filepath + ".tmp")
+
+
+class SheetsSink:
+    """Rewrites a Google Sheet once the run has finished, appending the rows in batches.
+
+    Rows are only collected while records arrive, so a run that fails or is
+    interrupted leaves the sheet as it was. With a `key_column` the rows are
+    synced instead, so only inserted, updated and deleted rows are sent to the API.
+    """
+
+    def __init__(self, headers, sheet_name, batch_size=SHEETS_BATCH_SIZE, key_column=None):
+        self.headers = headers
+        self.sheet_name = sheet_name
+        self.batch_size = batch_size
+        self.key_column = key_column
+        self.rows = []
+        self.count = 0
+
+    def write(self, record):
+        if self.key_column:
+            self.rows.append([to_cell(record.get(col, "")) for col in self.headers])
+            return
+
+        row = []
+        for col in self.headers:
+            value = record.get(col, "")
+            # List values such as brand countries become comma-separated cells
+            row.append(", ".join(value) if isinstance(value, list) else value)
+        self.rows.append(row)
+
+    #Function to clear the sheet and write the collected rows
+    @timed("save_to_google_sheets")
+    def flush(self):
+        if not self.rows:
+            return
+        sheet = open_sheet(self.sheet_name)
+        if sheet is None:
+            raise RuntimeError(f"Google Sheet '{self.sheet_name}' not found.")
+        sheet.clear()
+        sheet.append_row(self.headers)
+        logger.debug(f"Cleared '{self.sheet_name}' and wrote headers: {self.headers}")
+
+        for start in range(0, len(self.rows), self.batch_size):
+            sheet.append_rows(self.rows[start:start + self.batch_size], value_input_option="RAW")
+        self.count += len(self.rows)
+        self.rows = []
+
+    def close(self):
+        if self.key_column:
+            sync_rows_to_google_sheets(self.rows, self.headers, self.sheet_name, self.key_column)
+            return
+
+        self.flush()
+        if self.count:
+            logger.info(f"{self.count} rows written to Google Sheets: {self.sheet_name}")
+        else:
+            logger.info(" No data found to upload.")
+
+    def abort(self):
+        # The rows of an interrupted run are incomplete: a rewrite would truncate
+        # the sheet and a keyed sync would delete every row not scraped yet
+        self.rows = []
+        logger.warning(f"⚠️ Run did not finish, '{self.sheet_name}' was not synced.")
+
+
+#Function to feed one sink from its queue (runs in a thread)
+def _drain(sink, records, errors):
+    failed = False
+    while True:
+        record = records.get()
+        if record is _DONE or record is _ABORT:
+            break
+        if failed:
+            continue  # Keep draining so the producer never blocks on a broken sink
+        try:
+            sink.write(record)
+        except Exception as e:
+            errors.append((sink, e))
+            failed = True
+
+    # A sink that cannot keep partial output (the JSON file, the SQLite table, a
+    # sheet sync that deletes missing rows) discards it when anything failed;
+    # only sinks without an abort(), like the JSONL stream, keep what they wrote
+    try:
+        if record is _ABORT or failed:
+            if hasattr(sink, "abort"):
+                sink.abort()
+            elif not failed:
+                sink.close()
+        else:
+            sink.close()
+    except Exception as e:
+        errors.append((sink, e))
+
+
+#Function to stream records from a generator into all sinks concurrently
+def run_pipeline(records, sinks, errors=None):
+    """Returns the number of records produced; a failing sink is reported without stopping the others.
+
+    Pass a list as `errors` to get the (sink, exception) pairs back.
+    """
+    errors = [] if errors is None else errors
+    queues = [queue.Queue(maxsize=QUEUE_SIZE) for _ in sinks]
+    threads = [
+        threading.Thread(target=_drain, args=(sink, sink_queue, errors), daemon=True)
+        for sink, sink_queue in zip(sinks, queues)
+    ]
+    for thread in threads:
+        thread.start()
+
+    count = 0
+    end = _ABORT
+    try:
+        for record in records:
+            for sink_queue in queues:
+                sink_queue.put(record)
+            count += 1
+        end = _DONE
+    finally:
+        for sink_queue in queues:
+            sink_queue.put(end)
+        for thread in threads:
+            thread.join()
+
+    for sink, error in errors:
+        logger.error(f"❌ {type(sink).__name__} failed: {error}")
+
+    return count
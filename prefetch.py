@@ -0,0 +1,135 @@
+# prefetch.py
+# Loads the next listing page in a second browser tab while the current page's
+# pop-ups are processed, so page navigation overlaps with extraction.
+# Enabled with `main.py --prefetch`.
+import logging
+import os
+import time
+from driver_setup import block_heavy_requests
+from metrics import count
+from rate_control import get_controller
+from waits import wait_for
+
+logger = logging.getLogger(__name__)
+
+# Set to "1" to prefetch listing pages; an environment variable also reaches the
+# worker processes of a sharded crawl.
+PREFETCH_ENV = "NATRUE_PREFETCH"
+
+# ChromeDriver waits for any navigation the current tab starts, so the background
+# tab is navigated from the current one through its window name instead. That
+# returns at once; ChromeDriver only waits for the load when we switch to it.
+# (Pop-ups are not blocked under ChromeDriver.)
+OPEN_IN_JS = "window.open(arguments[0], arguments[1]);"
+NAME_JS = "window.name = arguments[0];"
+TAB_NAMES = ("natrue-scrape-a", "natrue-scrape-b")
+TAB_OPEN_TIMEOUT = 5
+# How long the page took to load, in milliseconds; 0 while it is still loading
+LOAD_DURATION_JS = "const entry = performance.getEntriesByType('navigation')[0]; return entry ? entry.duration : 0;"
+
+
+#Function to tell whether listing pages should be prefetched
+def prefetch_enabled():
+    return os.environ.get(PREFETCH_ENV) == "1"
+
+
+class TabPrefetcher:
+    """Keeps a background tab loading the next listing page; the two tabs swap roles on every page.
+
+    A prefetched load is a request like any other: it waits for the shared rate
+    controller before navigating and holds its slot until open_listing has
+    waited for the page. The controller sees the page's own load time, not how
+    long the loaded page sat in the background.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.spare = None  # Handle of the background tab
+        self.pending = None  # URL it is loading
+        self.started = None  # When its request started (time.perf_counter())
+        self.names = {}  # Tab handle -> window name
+
+    #Function to start loading a URL in the background tab; WebDriver stays on the current tab
+    def prefetch(self, url):
+        self.drop()
+        controller = get_controller()
+        controller.acquire()
+        started = time.perf_counter()
+        driver = self.driver
+        try:
+            if self.spare is None:
+                self.open_spare()
+            driver.execute_script(OPEN_IN_JS, url, self.names[self.spare])
+            self.pending, self.started = url, started
+            count("prefetches")
+        except Exception as e:
+            # The page is simply loaded the normal way when its turn comes; a tab or
+            # driver error never reached the site, so the controller is not told about it
+            logger.warning(f"⚠️ Could not prefetch {url}: {e}")
+            controller.cancel()
+
+    #Function to name the current tab and open a blank, named background tab next to it
+    def open_spare(self):
+        driver = self.driver
+        current = driver.current_window_handle
+        handles = set(driver.window_handles)
+        driver.execute_script(NAME_JS, TAB_NAMES[0])
+        driver.execute_script(OPEN_IN_JS, "about:blank", TAB_NAMES[1])
+        spare = wait_for(driver, lambda d: next(iter(set(d.window_handles) - handles), None), "prefetch_tab", TAB_OPEN_TIMEOUT)
+        self.names = {current: TAB_NAMES[0], spare: TAB_NAMES[1]}
+        self.spare = spare
+        if getattr(driver, "lean_profile", False):
+            # Blocked before the tab loads its first page
+            try:
+                driver.switch_to.window(spare)
+                block_heavy_requests(driver)
+            finally:
+                driver.switch_to.window(current)
+
+    #Function to switch to the background tab if it is loading `url`
+    def take(self, url):
+        """Returns when the prefetch's request started, for rate_control.request() to finish it,
+        or None if the URL must be loaded normally."""
+        if self.pending != url:
+            self.drop()
+            return None
+        driver = self.driver
+        previous = driver.current_window_handle
+        driver.switch_to.window(self.spare)
+        started = self.started
+        self.spare, self.pending, self.started = previous, None, None
+        count("prefetch_hits")
+        try:
+            loaded_in = (driver.execute_script(LOAD_DURATION_JS) or 0) / 1000
+        except Exception:
+            loaded_in = 0  # Still loading or no timing entry: count from the prefetch's start
+        return max(started, time.perf_counter() - loaded_in) if loaded_in else started
+
+    #Function to give back the rate controller slot of a prefetch that will not be used
+    def drop(self):
+        if self.pending is None:
+            return
+        # Nobody waited for the page, so there is no latency worth reporting
+        get_controller().cancel()
+        self.pending = self.started = None
+
+    #Function to close the background tab, leaving the driver on the tab being scraped
+    def close(self):
+        self.drop()
+        if self.spare is None:
+            return
+        driver = self.driver
+        current = driver.current_window_handle
+        try:
+            driver.switch_to.window(self.spare)
+            driver.close()
+        except Exception as e:
+            logger.debug(f"Could not close the prefetch tab: {e}")
+        finally:
+            driver.switch_to.window(current)
+            self.spare = None
+
+
+#Function to give a prefetcher for a driver when prefetching is enabled, else None
+def make_prefetcher(driver):
+    return TabPrefetcher(driver) if prefetch_enabled() else None
@@ -1,186 +1,399 @@
+import logging
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import ElementClickInterceptedException, TimeoutException, NoSuchElementException
-from driver_setup import setup_driver
-import time
-import re
-from data_saver import save_to_json,save_to_google_sheets
-
-
-#  extract the detials from the description
-def extract_sections(text):
-    if not text:
-        return {"Ingredients": None, "Description": None, "Usage": None}
-    
-    # More flexible regex pattern
-    pattern = r"Ingredients\s*(.*?)\s*(?:Description\s*(.*?)\s*)?(?:Usage\s*(.*))?$"
-
-    match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
-    
-    if match:
-        ingredients = match.group(1).strip() if match.group(1) and match.group(1).strip() else None
-        description = match.group(2).strip() if match.group(2) and match.group(2).strip() else None
-        usage = match.group(3).strip() if match.group(3) and match.group(3).strip() else None
-
-        # Remove new lines and extra spaces
-        def clean_text(value):
-            return " ".join(value.split()) if value else None
-
-        return {
-            "Ingredients": clean_text(ingredients),
-            "Description": clean_text(description),
-            "Usage": clean_text(usage)
-        }
-
-    return {"Ingredients": None, "Description": None, "Usage": None}
-
+from selenium.common.exceptions import TimeoutException
+from driver_setup import acquire_driver, release_driver
+from waits import open_listing, wait_for_dialog, wait_for_dialog_closed, save_wait_timings
+from crawl_pool import run_sharded
+from checkpoint import CheckpointStore, open_checkpoint
+from delta import DeltaSink, fingerprint, load_previous, build_cache, needs_full_refresh, mark_full_refresh
+from dom_extract import PRODUCT_CARD_FIELDS, PRODUCT_DIALOG_FIELDS, extract_all, extract_one, scroll_and_click, last_page_number
+from fast_path import API_BASE_URL, FastPathError, create_session, fetch_listing, fetch_details, get_field
+from sections import POPUP_TEXT_FIELD, extract_sections
+from pipeline import run_pipeline, IncompleteRun, JsonlSink, JsonSink, SheetsSink
+from metrics import timer, count
+from datastore import SqliteSink
+from rate_control import TransientError, retry
+from prefetch import make_prefetcher
+
+logger = logging.getLogger(__name__)
+
+
+# Payload paths used by the HTTP fast path, keyed by the record field they fill
+PRODUCT_API_FIELDS = {
+    "Name": "name",
+    "Brand": "brand.name",
+    "Image URL": "image.thumb",
+    "Certification": "certification.level",
+    "Dialog Product": "certification.description",
+    "Manufacturer": "manufacturer",
+    "Description": "description",
+}
+
+
+# Consecutive pages that may fail (after their retries) before the site is assumed to be down
+MAX_FAILED_PAGES = 3
+
+
+# Listing-card fields that identify a product, and those whose change means its pop-up must be re-read
+PRODUCT_KEY_FIELDS = ("Name", "Brand")
+PRODUCT_FINGERPRINT_FIELDS = ("Name", "Brand", "Image URL")
+
+
+# Function to Build a Product Record (shared by the Selenium and HTTP paths)
+def build_product_record(name, brand, image, certification_level, dialog_product, manufacturer, description):
+    return {
+        "Name": name,
+        "Brand": brand,
+        "Image URL": image,
+        "Certification": certification_level,
+        "Dialog Product": dialog_product,
+        "Manufacturer": manufacturer,
+        **extract_sections(description),
+        POPUP_TEXT_FIELD: description,  # Kept so `main.py sections` can re-split it offline
+    }
+
+
+# Function to Re-split the Sections of a Product Reused from the Previous Run
+def derive_product_fields(record):
+    # Records scraped before the pop-up text was kept have nothing to re-split
+    description = record.get(POPUP_TEXT_FIELD)
+    return record if description is None else {**record, **extract_sections(description)}
 
 
 #Function to Extract Product Details
 def extract_product_details(product):
     """Extracts name, brand, and image from the product listing."""
-    try:
-        name = product.find_element(By.CLASS_NAME, "product-list__item__name").text
-    except NoSuchElementException:
-        name = None
-
-    try:
-        brand = product.find_element(By.CLASS_NAME, "product-list__item__brand").text
-    except NoSuchElementException:
-        brand = None
-
-    try:
-        image = product.find_element(By.TAG_NAME, "img").get_attribute("src")
-    except NoSuchElementException:
-        image = None
-
-    return name, brand, image
+    card = extract_one(product.parent, PRODUCT_CARD_FIELDS, product)
+    return card["Name"], card["Brand"], card["Image URL"]
 
 #Function to Extract Pop-up Details
 
 def extract_popup_details(driver):
     """Extracts product details from the pop-up dialog."""
-    try:
-        certification_level = driver.find_element(By.CLASS_NAME, "dialog-product__certification__level").text
-    except NoSuchElementException:
-        certification_level = None
-
-    try:
-        dialog_product = driver.find_element(By.CLASS_NAME, "dialog-product__certification__description").text
-    except NoSuchElementException:
-        dialog_product = None
-
-    try:
-        manufacturer = driver.find_element(By.XPATH, "//div[@class='dialog-product__info__content']").text
-    except NoSuchElementException:
-        manufacturer = None
-
-    try:
-        description = driver.find_element(By.CLASS_NAME, "dialog-product__description").text
-    except NoSuchElementException:
-        description = None
-
-    return certification_level, dialog_product, manufacturer, description
+    dialog = extract_one(driver, PRODUCT_DIALOG_FIELDS)
+    return dialog["Certification"], dialog["Dialog Product"], dialog["Manufacturer"], dialog["Description"]
 
 # Function to Scrape a Single Page
 
-def scrape_page(driver, url):
-    driver.get(url)
-    
+def scrape_page(driver, url, checkpoint=None, cache=None, prefetcher=None, next_url=None):
+    """Returns the page's products, or None past the last page; raises TransientError if the page did not load.
+
+    With a prefetcher, `next_url` starts loading in a background tab while this page's pop-ups are read.
+    """
     # Wait for product list to load
-    try:
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "product-list__item"))
-        )
-    except TimeoutException:
-        print(f"❌ No products found or page did not load: {url}")
+    if not open_listing(driver, url, "product-list__item", "product-list", prefetcher=prefetcher):
+        logger.info(f"No products on {url}, past the last page.")
         return None
 
     products = driver.find_elements(By.CLASS_NAME, "product-list__item")
     if not products:
-        print(f"❌ No products found on {url}. Stopping pagination.")
+        logger.error(f"❌ No products found on {url}. Stopping pagination.")
         return None
 
+    # Read every card's fields in a single round trip
+    with timer("extract"):
+        cards = extract_all(driver, ".product-list__item", PRODUCT_CARD_FIELDS)
+
+    if prefetcher and next_url:
+        prefetcher.prefetch(next_url)
+
     scraped_data = []
     actions = ActionChains(driver)
+    dialog_locator = (By.CLASS_NAME, "dialog-product")
+    previous_dialog = previous_dialog_text = None
 
-    for i, product in enumerate(products):
-        try:
-           
-            name, brand, image = extract_product_details(product)
+    for i, (product, card) in enumerate(zip(products, cards)):
+        # Reuse products finished before an interruption
+        saved = checkpoint.get_item(url, i) if checkpoint else None
+        if saved:
+            scraped_data.append(saved)
+            count("checkpoint_hits")
+            continue
 
+        try:
            
-            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", product)
-            time.sleep(1)
+            name, brand, image = card["Name"], card["Brand"], card["Image URL"]
 
-            
-            driver.execute_script("arguments[0].click();", product)
+            # Unchanged card: reuse last run's pop-up details instead of opening it
+            cached = cache.get(fingerprint(card, PRODUCT_FINGERPRINT_FIELDS)) if cache else None
+            if cached:
+                scraped_data.append(dict(cached))
+                count("cache_hits")
+                continue
 
-            # Wait for pop-up
+           
+            # Wait for pop-up to show this product rather than the previous one
             try:
-                WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, "dialog-product"))
-                )
+                with timer("popup_open"):
+                    scroll_and_click(driver, product)
+                    previous_dialog = wait_for_dialog(driver, dialog_locator, previous_dialog, previous_dialog_text)
+                    previous_dialog_text = previous_dialog.text
             except TimeoutException:
-                print(f"⚠️ Pop-up did not appear for product {i + 1}. Skipping...")
+                logger.warning(f"⚠️ Pop-up did not appear for product {i + 1}. Skipping...")
+                count("popup_timeouts")
                 continue  
 
             # Extract pop-up details
-            certification_level, dialog_product, manufacturer, description = extract_popup_details(driver)
+            with timer("extract"):
+                certification_level, dialog_product, manufacturer, description = extract_popup_details(driver)
 
-            
-            actions.send_keys(Keys.ESCAPE).perform()
-            time.sleep(1)
+            with timer("popup_close"):
+                actions.send_keys(Keys.ESCAPE).perform()
+                wait_for_dialog_closed(driver, dialog_locator)
 
             # Store scraped data
-            scraped_data.append({
-                "Name": name,
-                "Brand": brand,
-                "Image URL": image,
-                "Certification": certification_level,
-                "Dialog Product": dialog_product,
-                "Manufacturer": manufacturer,
-                **extract_sections(description)
-            })
+            scraped_data.append(build_product_record(
+                name, brand, image, certification_level, dialog_product, manufacturer, description
+            ))
+            count("products_scraped")
+            if checkpoint:
+                checkpoint.save_item(url, i, scraped_data[-1])
 
         except Exception as e:
-            print(f"❌ Error scraping product {i + 1}: {e}")
+            logger.error(f"❌ Error scraping product {i + 1}: {e}")
+            count("scrape_errors")
+
+    return scraped_data
+
+
+# Function to Scrape a Single Page over HTTP (no browser)
+def scrape_page_fast(session, page, api_base_url=API_BASE_URL, cache=None):
+    items = fetch_listing(session, "products", {"pageIndex": page}, api_base_url)
+    if not items:
+        return None
+
+    # Only new or changed cards need their detail payload
+    cards = [{field: get_field(item, path) for field, path in PRODUCT_API_FIELDS.items()} for item in items]
+    cached = [cache.get(fingerprint(card, PRODUCT_FINGERPRINT_FIELDS)) if cache else None for card in cards]
+    missing = [item for item, record in zip(items, cached) if not record]
+    details = iter(fetch_details(session, "products", missing, api_base_url))
+
+    scraped_data = []
+    for item, card, record in zip(items, cards, cached):
+        if record:
+            scraped_data.append(dict(record))
+            continue
+
+        detail = next(details)
+        fields = {field: get_field(detail, path) or card[field] for field, path in PRODUCT_API_FIELDS.items()}
+        scraped_data.append(build_product_record(
+            fields["Name"], fields["Brand"], fields["Image URL"], fields["Certification"],
+            fields["Dialog Product"], fields["Manufacturer"], fields["Description"]
+        ))
+
+    return scraped_data
+
+
+# Function to Build the URL of a Listing Page
+def get_page_url(base_url, page):
+    return f"{base_url}&prod[pageIndex]={page}&prod[search]="
+
+
+# Function to Scrape a Page unless a Checkpoint Already Holds it
+def scrape_page_checkpointed(driver, url, checkpoint=None, cache=None, prefetcher=None, next_url=None):
+    if checkpoint and checkpoint.is_done(url):
+        logger.info("⏭️ Page already scraped, reusing checkpoint.")
+        return checkpoint.get_records(url)
+
+    # Pages a checkpoint already holds are not worth prefetching
+    if next_url and checkpoint and checkpoint.is_done(next_url):
+        next_url = None
+
+    # A page that did not load is retried with backoff before it counts as failed
+    scraped_data = retry(scrape_page, driver, url, checkpoint, cache, prefetcher, next_url)
+    if checkpoint and scraped_data:
+        checkpoint.mark_done(url, scraped_data)
 
     return scraped_data
 
 
+# Function to Bound the Page Count by the Listing's Pager
+def pages_in_pager(driver, max_pages):
+    """Returns (max_pages, whether the pager was found). The pager shows the real number of
+    pages, so pages past the end are never requested; a page reused from a checkpoint leaves
+    the browser on no listing at all, and the pager is read from a later page instead."""
+    last_page = last_page_number(driver)
+    if last_page is None:
+        return max_pages, False
+    if last_page < max_pages:
+        logger.info(f"Pager shows {last_page} pages.")
+    return min(max_pages, last_page), True
+
+
+# Function to Stream Products from Multiple Pages
+def iter_all_pages(driver, base_url, max_pages=3, checkpoint=None, cache=None, start_page=1):
+    """Raises IncompleteRun after the last page if any page still failed after its retries."""
+    page = start_page
+    failed_pages = []
+    failed_in_a_row = 0
+    pager_read = False
+    prefetcher = make_prefetcher(driver)
+
+    try:
+        while page <= max_pages:
+            logger.info(f"📄 Scraping Page {page}...")
+            page_url = get_page_url(base_url, page)
+            next_url = get_page_url(base_url, page + 1) if page < max_pages else None
+            try:
+                scraped_data = scrape_page_checkpointed(driver, page_url, checkpoint, cache, prefetcher, next_url)
+            except TransientError as e:
+                # Skip the page (a --resume run picks it up) unless the site looks down
+                logger.error(f"❌ Giving up on page {page}: {e}")
+                count("pages_failed")
+                failed_pages.append(page)
+                failed_in_a_row += 1
+                if failed_in_a_row == MAX_FAILED_PAGES:
+                    logger.error(f"❌ {MAX_FAILED_PAGES} pages in a row failed. Stopping pagination.")
+                    break
+                page += 1
+                continue
+
+            failed_in_a_row = 0
+            if scraped_data is None:  # Past the last page
+                break
+            if not pager_read:
+                max_pages, pager_read = pages_in_pager(driver, max_pages)
+
+            yield from scraped_data
+            page += 1
+    finally:
+        if prefetcher:
+            prefetcher.close()
+
+    if failed_pages:
+        raise IncompleteRun(f"product pages {failed_pages} failed")
+
+
 # Function to Scrape Multiple Pages
-def scrape_all_pages(driver, base_url, max_pages=3):
-    all_data = []
-    page = 1
+def scrape_all_pages(driver, base_url, max_pages=3, checkpoint=None, cache=None):
+    return list(iter_all_pages(driver, base_url, max_pages, checkpoint, cache))
 
-    while page <= max_pages:
-        print(f"📄 Scraping Page {page}...")
-        page_url = f"{base_url}&prod[pageIndex]={page}&prod[search]="
-        scraped_data = scrape_page(driver, page_url)
 
-        if not scraped_data:  # If no products found, stop
+# Function to Scrape a Shard of Pages in its Own Browser (runs in a worker process)
+def scrape_page_shard(pages, base_url, cache=None):
+    """Returns {page: records}; None marks the last page and failed pages are left out."""
+    driver = acquire_driver()
+    checkpoint = CheckpointStore("products")  # Already reset by the parent unless resuming
+    prefetcher = make_prefetcher(driver)
+    results = {}
+    last_page = None
+
+    try:
+        for i, page in enumerate(pages):
+            if last_page and page > last_page:
+                results[page] = None  # Past the last page the pager shows
+                break
+            logger.info(f"📄 Scraping Page {page}...")
+            next_url = get_page_url(base_url, pages[i + 1]) if i + 1 < len(pages) else None
+            try:
+                results[page] = scrape_page_checkpointed(driver, get_page_url(base_url, page), checkpoint, cache, prefetcher, next_url)
+            except TransientError as e:
+                logger.error(f"❌ Giving up on page {page}: {e}")
+                count("pages_failed")
+                continue
+
+            if results[page] is None:  # Later pages in this shard are past the end too
+                break
+            if not last_page:
+                last_page = last_page_number(driver)
+    finally:
+        if prefetcher:
+            prefetcher.close()
+        release_driver(driver)
+        checkpoint.close()
+
+    return results
+
+
+# Function to Scrape Multiple Pages with a Pool of Browsers
+def scrape_all_pages_parallel(base_url, max_pages=3, workers=4, cache=None, start_page=1):
+    results, failed = run_sharded(scrape_page_shard, range(start_page, max_pages + 1), workers, base_url, cache)
+
+    # Merge in page order, stopping at the last page like the sequential crawl
+    all_data = []
+    missing = []
+    for page in range(start_page, max_pages + 1):
+        if page not in results:
+            missing.append(page)  # Failed after its retries, or its worker did
+            continue
+        if results[page] is None:
             break
-        
-        all_data.extend(scraped_data)
-        page += 1
+        all_data.extend(results[page])
 
+    if missing:
+        raise IncompleteRun(f"product pages {missing} failed" + (f", {len(set(failed) & set(missing))} of them in a crashed worker" if failed else ""))
     return all_data
 
 
+# Function to Stream all Pages from the Browser (single session or a pool of workers)
+def iter_with_selenium(base_url, max_pages, workers=1, checkpoint=None, cache=None, start_page=1):
+    if workers > 1:
+        yield from scrape_all_pages_parallel(base_url, max_pages, workers, cache, start_page)
+        return
+
+    driver = acquire_driver()
+    try:
+        yield from iter_all_pages(driver, base_url, max_pages, checkpoint, cache, start_page)
+    finally:
+        release_driver(driver)  # Hand the browser back (or quit it) even if there's an error
+        save_wait_timings("products_wait_timings.json")
 
-def products_scraping():
-    base_url = "https://natrue.org/our-standard/natrue-certified-world/?database[tab]=products"
-    driver = setup_driver()
 
+# Function to Stream all Products, over HTTP first (with use_fast_path) and in the browser as the fallback
+def iter_products(base_url, max_pages, workers=1, use_fast_path=False, checkpoint=None, cache=None):
+    start_page = 1
+
+    if use_fast_path:
+        try:
+            session = create_session()
+            for page in range(1, max_pages + 1):
+                logger.info(f"📄 Fetching Page {page}...")
+                scraped_data = scrape_page_fast(session, page, cache=cache)
+                if not scraped_data:
+                    break
+                yield from scraped_data
+                start_page = page + 1
+        except FastPathError as e:
+            logger.warning(f"⚠️ HTTP fast path failed ({e}). Falling back to Selenium from page {start_page}...")
+        else:
+            if start_page > 1:
+                return
+
+    # Selenium picks up at the first page the fast path did not deliver
+    yield from iter_with_selenium(base_url, max_pages, workers, checkpoint, cache, start_page)
+
+
+def products_scraping(workers=1, use_fast_path=False, resume=False, full_refresh=False):
+    base_url = "https://natrue.org/our-standard/natrue-certified-world/?database[tab]=products"
+    max_pages = 150 #this could be dynamic number just and it could be scraped from the website
+    headers = ["Name", "Brand", "Image URL", "Certification", "Dialog Product", "Manufacturer", "Ingredients", "Description", "Usage"]
+    checkpoint = open_checkpoint("products", resume)  # Pages and products are recorded as they finish
+
+    # Pop-ups are only opened for new or changed cards, except on a periodic full refresh
+    previous = load_previous("products.json")
+    full_refresh = full_refresh or needs_full_refresh("products")
+    cache = None if full_refresh else build_cache(previous, PRODUCT_FINGERPRINT_FIELDS, derive_product_fields)
+
+    # Records are written to every sink as they are scraped instead of at the end
+    sinks = [
+        JsonlSink("products.jsonl"),
+        JsonSink("products.json"),
+        SheetsSink(headers, "Products_sheet", key_column="Name"), #make sure google sheet is exist before run this function
+        DeltaSink("Products", previous, PRODUCT_KEY_FIELDS, PRODUCT_FINGERPRINT_FIELDS),
+        SqliteSink("products"),
+    ]
     try:
-        scraped_data = scrape_all_pages(driver, base_url, max_pages=150)#this could be dynamic number just and it could be scraped from the website
-        save_to_json(scraped_data, "products.json")
-        save_to_google_sheets(scraped_data,["Name", "Brand", "Image URL", "Certification", "Dialog Product", "Manufacturer", "Ingredients", "Description", "Usage"],"Products_sheet",) #make sure google sheet is exist before run this function
+        records = run_pipeline(iter_products(base_url, max_pages, workers, use_fast_path, checkpoint, cache), sinks)
+    except IncompleteRun as e:
+        # The sinks kept the last complete run; the checkpoint holds the pages that did finish
+        logger.error(f"❌ Products crawl incomplete ({e}). Previous output kept, run again with --resume to fetch the rest.")
+        return
     finally:
-        driver.quit()  # Ensure driver quits even if there's an error
+        checkpoint.close()
+
+    if full_refresh and records:
+        mark_full_refresh("products")
 
 # products_scraping()
@@ -0,0 +1,199 @@
+# rate_control.py
+# One rate controller for all traffic to the NATRUE site in a process: page
+# loads in the browser, the HTTP fast path and thumbnail downloads.
+# A token bucket caps requests per second and an AIMD limit caps requests in
+# flight. Both are halved on timeouts, error pages and slow responses, and grow
+# back step by step while responses stay fast.
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from metrics import count, observe
+
+logger = logging.getLogger(__name__)
+
+MAX_RATE_ENV = "NATRUE_MAX_RATE"
+START_RATE = 2.0  # Requests per second
+MIN_RATE = 0.2
+MAX_RATE = float(os.environ.get(MAX_RATE_ENV) or 10.0)
+RATE_INCREASE = 0.5  # Requests per second gained per second of healthy traffic
+BURST = 4
+START_CONCURRENCY = 2
+MAX_CONCURRENCY = 16
+HEALTHY_LATENCY = 5.0  # Slower responses are treated as the server struggling
+
+RETRY_ATTEMPTS = 4
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+
+
+class TransientError(Exception):
+    """A request that failed in a way worth retrying (timeout, error page, HTTP 429/5xx).
+
+    `retry_after` carries the server's Retry-After hint in seconds, if it sent one.
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Request:
+    """One request through a RateController; yielded by request() so the caller can end its measured latency early."""
+
+    def __init__(self, started):
+        self.started = started
+        self.stopped = None
+
+    #Function to end the measured latency at `at` (time.perf_counter(), default now), e.g. before a wait the server is not behind
+    def stop(self, at=None):
+        self.stopped = time.perf_counter() if at is None else at
+
+    def latency(self):
+        return (self.stopped or time.perf_counter()) - self.started
+
+
+class RateController:
+    """Token bucket plus additive-increase/multiplicative-decrease concurrency limit."""
+
+    def __init__(self, rate=START_RATE, max_rate=MAX_RATE, min_rate=MIN_RATE, burst=BURST,
+                 concurrency=START_CONCURRENCY, max_concurrency=MAX_CONCURRENCY, healthy_latency=HEALTHY_LATENCY):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.rate = min(rate, max_rate)
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.max_concurrency = max_concurrency
+        self.limit = float(min(concurrency, max_concurrency))
+        self.in_flight = 0
+        self.healthy_latency = healthy_latency
+        self.slow_start = True  # Grow quickly until the first sign of trouble, like TCP
+        self.last_decrease = None
+        self.condition = threading.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    #Function to block until a request may start
+    def acquire(self):
+        start = time.perf_counter()
+        with self.condition:
+            while True:
+                self._refill(time.monotonic())
+                if self.in_flight < int(self.limit) and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    break
+                # Out of slots: wait for a release; out of tokens: wait for the next one
+                self.condition.wait(None if self.in_flight >= int(self.limit) else (1 - self.tokens) / self.rate)
+        observe("rate_wait", time.perf_counter() - start)
+
+    #Function to report how a request went and adjust the limits
+    def release(self, latency, ok):
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if ok and latency <= self.healthy_latency:
+                if self.slow_start:
+                    # Roughly doubles the rate every second and the limit every window
+                    self.limit = min(self.max_concurrency, self.limit + 1)
+                    self.rate = min(self.max_rate, self.rate + 1)
+                else:
+                    # Additive increase: about one more slot per window of healthy requests
+                    self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                    self.rate = min(self.max_rate, self.rate + RATE_INCREASE / self.rate)
+            elif self.last_decrease is None or now - self.last_decrease > self.healthy_latency:
+                # Multiplicative decrease, once per congestion event rather than once per failed request
+                self.limit = max(1.0, self.limit / 2)
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.slow_start = False
+                self.last_decrease = now
+                count("rate_backoffs")
+                logger.warning(f"🐢 Backing off to {self.rate:.2f} requests/s, {int(self.limit)} in flight",
+                               extra={"rate": round(self.rate, 2), "limit": int(self.limit), "latency": round(latency, 2)})
+            self.condition.notify_all()
+
+    #Function to give back a slot without reporting on the request (it failed before reaching the server)
+    def cancel(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    #Context manager for one request; any exception counts as a failure
+    @contextmanager
+    def request(self, started=None):
+        """`started` takes over a request already acquired at that time.perf_counter() value (e.g. a prefetched page)."""
+        if started is None:
+            self.acquire()
+            started = time.perf_counter()
+        attempt = Request(started)
+        ok = False
+        try:
+            yield attempt
+            ok = True
+        finally:
+            self.release(attempt.latency(), ok)
+
+    def state(self):
+        with self.condition:
+            return {"rate": round(self.rate, 2), "limit": int(self.limit), "in_flight": self.in_flight}
+
+
+_controller = None
+_controller_pid = None
+_controller_lock = threading.Lock()
+_max_rate = MAX_RATE
+
+
+#Function to set the ceiling of this process's controller (e.g. a share of the total for a worker process)
+def configure(max_rate):
+    global _max_rate, _controller
+    with _controller_lock:
+        _max_rate = max_rate
+        _controller = None
+
+
+#Function to give the controller shared by everything in this process
+def get_controller():
+    global _controller, _controller_pid
+    with _controller_lock:
+        # A forked worker gets its own controller rather than a copy of the parent's (and its locks)
+        if _controller is None or _controller_pid != os.getpid():
+            _controller = RateController(max_rate=_max_rate)
+            _controller_pid = os.getpid()
+        return _controller
+
+
+#Function to give the configured ceiling, so it can be split between worker processes
+def max_rate():
+    return _max_rate
+
+
+#Context manager for one request through the shared controller
+def request(started=None):
+    return get_controller().request(started)
+
+
+#Function to pick the delay before retry `attempt` (1-based): exponential, with jitter so clients don't retry in step
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY, retry_after=None):
+    ceiling = min(cap, base * 2 ** (attempt - 1))
+    delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+    return max(delay, min(cap, retry_after or 0))
+
+
+#Function to call `func`, retrying the exceptions in `retry_on` with jittered backoff
+def retry(func, *args, attempts=RETRY_ATTEMPTS, retry_on=(TransientError,), **kwargs):
+    for attempt in range(1, attempts + 1):
+        try:
+            return func(*args, **kwargs)
+        except retry_on as e:
+            if attempt == attempts:
+                raise
+            delay = backoff_delay(attempt, retry_after=getattr(e, "retry_after", None))
+            count("retries")
+            logger.warning(f"🔁 {e} - retrying in {delay:.1f}s (attempt {attempt + 1} of {attempts})")
+            time.sleep(delay)
@@ -1,136 +1,236 @@
-import time
+import logging
+import hashlib
 import os
 import json
 import sys
-import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from data_saver import save_to_google_sheets
+from datetime import date, datetime
+from pipeline import run_pipeline, JsonlSink, JsonSink, SheetsSink
+from checkpoint import open_checkpoint
+from metrics import timer
+from datastore import SqliteSink
+from rate_control import TransientError, request, retry
+
+logger = logging.getLogger(__name__)
 
 DOWNLOAD_DIRECTORY = os.path.abspath("downloads")
 EXCEL_EXTENSION = ".xlsx"
 JSON_EXTENSION = ".json"
+RAW_MATERIAL_HEADERS = ["Name", "Manufacturer", "Composition", "INCI", "Status", "Expiration"]
+EXPORT_BUTTON = ("xpath", "//button[contains(text(), 'Export')]")  # Selenium locator (By.XPATH)
+OVERLAY_CLOSE_BUTTON = ("xpath", "//button[@class='close-overlay']")
+EXPORT_BUTTON_TIMEOUT = 15
+OVERLAY_TIMEOUT = 5
+EXPIRATION_FORMAT = "%d/%m/%Y"  # The format the export uses for dates stored as text
+# SHA-256 of the last export that was converted and uploaded
+EXPORT_STATE_FILE = os.path.join("scraped_data", "raw_materials_export.json")
 
 
 def setup_download_directory():
     os.makedirs(DOWNLOAD_DIRECTORY, exist_ok=True)
 
 
+# The browser-side functions import Selenium themselves, so converting an
+# export that is already on disk does not load it
+
 def configure_driver():
-    chrome_options = Options()
-    chrome_options.add_experimental_option("prefs", {
-        "download.default_directory": DOWNLOAD_DIRECTORY,
-        "download.prompt_for_download": False,
-        "safebrowsing.enabled": True
+    from driver_setup import acquire_driver
+
+    # Reuse the warm browser from the products/brands tabs; downloads are
+    # routed per session, so no profile prefs (and no new Chrome) are needed
+    driver = acquire_driver()
+    driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+        "behavior": "allow",
+        "downloadPath": DOWNLOAD_DIRECTORY,
     })
-
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
     return driver
 
 
+#Function to open the raw-materials tab through the shared rate controller; returns the export button
+def open_export_page(driver, url):
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    with request():
+        with timer("navigate"):
+            driver.get(url)
+        try:
+            return WebDriverWait(driver, EXPORT_BUTTON_TIMEOUT).until(EC.visibility_of_element_located(EXPORT_BUTTON))
+        except TimeoutException as e:
+            raise TransientError(f"Export button did not appear on {url}") from e
+
+
 def download_excel(driver, url):
-    driver.get(url)
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from driver_setup import release_driver
+    from waits import wait_for_download
 
     try:
-        wait = WebDriverWait(driver, 15)
-        export_button = wait.until(EC.visibility_of_element_located((By.XPATH, "//button[contains(text(), 'Export')]")))
+        # A page that did not load is retried with backoff
+        export_button = retry(open_export_page, driver, url)
 
         driver.execute_script("arguments[0].scrollIntoView(true);", export_button)
         
-        wait.until(EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Export')]")))
+        WebDriverWait(driver, EXPORT_BUTTON_TIMEOUT).until(EC.element_to_be_clickable(EXPORT_BUTTON))
 
         try:
-            overlay_close_button = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.XPATH, "//button[@class='close-overlay']"))
+            overlay_close_button = WebDriverWait(driver, OVERLAY_TIMEOUT).until(
+                EC.element_to_be_clickable(OVERLAY_CLOSE_BUTTON)
             )
             overlay_close_button.click()
-            print("Closed overlay.")
+            logger.debug("Closed overlay.")
         except TimeoutException:
-            print("No overlay found.")
+            logger.debug("No overlay found.")
 
+        # Only a file that appears after the click counts, so a stale export left in downloads/ is ignored
+        before = set(os.listdir(DOWNLOAD_DIRECTORY))
         driver.execute_script("arguments[0].click();", export_button)
-        print("Clicked the export button. Waiting for download...")
+        logger.info("Clicked the export button. Waiting for download...")
 
-        timeout = 30
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            files = [f for f in os.listdir(DOWNLOAD_DIRECTORY) if f.endswith(EXCEL_EXTENSION)]
-            if files:
-                print("Download complete.")
-                return
-            time.sleep(2)
+        with timer("download"):
+            excel_file_path = wait_for_download(driver, DOWNLOAD_DIRECTORY, before, EXCEL_EXTENSION)
+        if excel_file_path:
+            logger.info(f"Download complete: {excel_file_path}")
+            return excel_file_path
 
-        print("Download failed: No Excel file found.")
+        logger.warning("Download failed: No Excel file found.")
 
-    except TimeoutException:
-        print("Timed out waiting for the export button.")
+    except (TransientError, TimeoutException):
+        logger.warning("Timed out waiting for the export button.")
     except Exception as e:
-        print(f"Unexpected error: {e}")
+        logger.error(f"Unexpected error: {e}")
     finally:
-        driver.quit()
+        release_driver(driver)
 
 def find_downloaded_file():
     files = [f for f in os.listdir(DOWNLOAD_DIRECTORY) if f.endswith(EXCEL_EXTENSION)]
     if not files:
-        print("No Excel file found.")
+        logger.warning("No Excel file found.")
         sys.exit(1)
 
-    excel_file_path = os.path.join(DOWNLOAD_DIRECTORY, files[0])
-    print(f"Found Excel file: {excel_file_path}")
+    # Newest export wins over files left behind by earlier runs
+    excel_file_path = max((os.path.join(DOWNLOAD_DIRECTORY, f) for f in files), key=os.path.getmtime)
+    logger.info(f"Found Excel file: {excel_file_path}")
     return excel_file_path
 
 
-def convert_xlsx_to_json(xlsxfile):
-    df = pd.read_excel(xlsxfile, engine="openpyxl")
-
-    json_data = df.to_json(orient="records", indent=4, force_ascii=False)
+#Function to normalise one spreadsheet cell
+def normalize_cell(value):
+    """Strips the non-breaking spaces some names start with and formats real date cells like the text ones."""
+    if isinstance(value, (datetime, date)):
+        return value.strftime(EXPIRATION_FORMAT)
+    if isinstance(value, str):
+        value = value.replace("\xa0", " ").strip()
+        return value or None
+    return value
 
-    os.makedirs("scraped_data", exist_ok=True)
-    filepath = os.path.join("scraped_data", "raw_materials1.json")
 
-    # Save to JSON file
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(json_data)
+#Function to stream the export's rows as records without loading the whole workbook
+def iter_xlsx_records(xlsxfile):
+    from openpyxl import load_workbook
 
-    print(f"Conversion complete!")
-
-def convert_and_save_file():
-        excel_file_path = find_downloaded_file()
+    workbook = load_workbook(xlsxfile, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [normalize_cell(cell) for cell in next(rows, ())]
+        for row in rows:
+            if not any(cell is not None for cell in row):
+                continue  # Trailing empty rows
+            yield {header: normalize_cell(cell) for header, cell in zip(headers, row) if header}
+    finally:
+        workbook.close()
 
-        if not excel_file_path:
-            print("No file found to process. Exiting.")
-            return  # Exit the function early if the file is not found.
-        
-        convert_xlsx_to_json(excel_file_path)
-        
-        file_path = os.path.join(os.getcwd(), "scraped_data", "raw_materials1.json")
 
-        if not os.path.exists(file_path):
-            print(f"File not found: {file_path}")
-        else:
-            with open(file_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
-            print("Data loaded from JSON. Saving to Google Sheets...")
-            save_to_google_sheets(data, ["Name", "Manufacturer", "Composition", "INCI", "Status", "Expiration"], "raw_materials")#make sure google sheet is exist before run this function
+#Function to hash a file in chunks
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 
-def raw_materials_scraping():
+#Function to read the hash of the last processed export
+def load_export_hash():
+    try:
+        with open(EXPORT_STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f).get("sha256")
+    except (OSError, ValueError):
+        return None
+
+
+#Function to remember the hash of the export that was just processed
+def save_export_hash(sha256, excel_file_path):
+    os.makedirs(os.path.dirname(EXPORT_STATE_FILE), exist_ok=True)
+    with open(EXPORT_STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump({"sha256": sha256, "file": os.path.basename(excel_file_path)}, f, indent=4)
+
+
+def convert_and_save_file(excel_file_path=None, upload=True):
+    """Returns True once every output holds the export (or already did), False if anything was not written.
+
+    With `upload=False` only the local JSON files and database are rewritten (an offline re-parse).
+    """
+    excel_file_path = excel_file_path or find_downloaded_file()
+
+    if not excel_file_path:
+        logger.warning("No file found to process. Exiting.")
+        return False  # Exit the function early if the file is not found.
+
+    export_hash = file_sha256(excel_file_path)
+    if upload and export_hash == load_export_hash():
+        logger.info("⏭️ Export is unchanged since the last run, skipping conversion and upload.")
+        return True
+
+    # One pass over the workbook feeds the JSON files and Google Sheets
+    sinks = [
+        JsonlSink("raw_materials1.jsonl"),
+        JsonSink("raw_materials1.json"),
+        SqliteSink("raw_materials"),
+    ]
+    if upload:
+        sinks.append(SheetsSink(RAW_MATERIAL_HEADERS, "raw_materials", key_column="Name")) #make sure google sheet is exist before run this function
+    errors = []
+    count = run_pipeline(iter_xlsx_records(excel_file_path), sinks, errors)
+    logger.info(f"Conversion complete! {count} raw materials processed.")
+
+    if errors or not count:
+        logger.error("❌ Raw materials were not saved everywhere; they will be converted again next run.")
+        return False
+
+    # An offline re-parse leaves the upload to the next full run
+    if upload:
+        save_export_hash(export_hash, excel_file_path)
+    return True
+
+
+def raw_materials_scraping(resume=False):
     setup_download_directory()
-    driver = configure_driver()
+    checkpoint = open_checkpoint("raw_materials", resume)
+
+    if checkpoint.is_done("upload"):
+        logger.info("⏭️ Raw materials already exported and uploaded, reusing checkpoint.")
+        checkpoint.close()
+        return
 
     try:
-        url = "https://natrue.org/our-standard/natrue-certified-world/?database[tab]=raw-materials"
-        download_excel(driver, url)
-        convert_and_save_file()
+        excel_file_path = None
+        if not checkpoint.is_done("download"):
+            driver = configure_driver()
+            url = "https://natrue.org/our-standard/natrue-certified-world/?database[tab]=raw-materials"
+            excel_file_path = download_excel(driver, url)
+            if not excel_file_path:
+                return  # Don't fall back to a stale export from an earlier run
+            checkpoint.mark_done("download", [])
+        # A --resume run only skips the upload once it really happened
+        if convert_and_save_file(excel_file_path):
+            checkpoint.mark_done("upload", [])
     except Exception as e:
-        print(f"An error occurred: {e}")
+        logger.error(f"An error occurred: {e}")
+    finally:
+        checkpoint.close()
 
 
 # raw_materials_scraping()
@@ -0,0 +1,103 @@
+# sections.py
+# Splits a product pop-up's text into its Ingredients, Description and Usage
+# sections in one pass: heading positions are found once and each section runs
+# up to the next heading, in whatever order the headings appear.
+# Product records keep the pop-up text itself in "Popup Text", so the sections
+# can be re-derived offline after the splitter changes.
+import logging
+import os
+import re
+from delta import load_previous
+from pipeline import run_pipeline, JsonSink
+from metrics import setup_logging
+
+logger = logging.getLogger(__name__)
+
+SECTION_HEADINGS = ("Ingredients", "Description", "Usage")
+POPUP_TEXT_FIELD = "Popup Text"
+
+# In the pop-up's text a heading usually sits on a line of its own, which keeps
+# words like "Main Ingredients" inside the ingredient list from splitting it
+HEADING_LINE = re.compile(r"^[ \t]*(Ingredients|Description|Usage)[ \t]*:?[ \t]*$", re.MULTILINE | re.IGNORECASE)
+# A capitalised heading with a colon may share its line with the text, e.g. "Usage: Apply daily."
+HEADING_LABEL = re.compile(r"\b(Ingredients|Description|Usage)[ \t]*:")
+# Flattened text (no line breaks) only has the capitalised words to go by
+HEADING_WORD = re.compile(r"\b(Ingredients|Description|Usage)\b")
+
+
+#Function to find where each section's heading starts and its text begins
+def find_headings(text):
+    """Returns (heading, heading start, text start) sorted by position; the first occurrence of each heading wins.
+
+    Own-line headings come first, and headings missing from them are looked for
+    as "Heading:" labels, so a pop-up mixing both layouts keeps every section.
+    Bare words are only used when no heading has a line of its own.
+    """
+    found = {}
+    regexes = (HEADING_LINE, HEADING_LABEL) if HEADING_LINE.search(text) else (HEADING_LABEL, HEADING_WORD)
+    for regex in regexes:
+        for match in regex.finditer(text):
+            found.setdefault(match.group(1).title(), (match.start(), match.end()))
+    return sorted(((heading, start, end) for heading, (start, end) in found.items()), key=lambda item: item[1])
+
+
+#Function to collapse new lines and extra spaces; empty text becomes None
+def clean_text(value):
+    return " ".join(value.split()) or None
+
+
+#Function to split a pop-up text into its sections
+def extract_sections(text):
+    sections = dict.fromkeys(SECTION_HEADINGS)
+    if not text:
+        return sections
+
+    headings = find_headings(text)
+    for index, (heading, _, text_start) in enumerate(headings):
+        text_end = headings[index + 1][1] if index + 1 < len(headings) else len(text)
+        sections[heading] = clean_text(text[text_start:text_end])
+    return sections
+
+
+#Function to rebuild the pop-up text of a scraped record from its sections
+def join_sections(record):
+    return "\n".join(f"{heading}\n{record[heading]}" for heading in SECTION_HEADINGS if record.get(heading))
+
+
+#Function to give the pop-up text a record was scraped from (None for records scraped before it was kept)
+def popup_text(record):
+    return record.get(POPUP_TEXT_FIELD)
+
+
+#Function to re-split the sections of many records
+def apply_sections(records, text_of=popup_text, missing=None):
+    """Yields each record with its sections re-derived from `text_of(record)`.
+
+    Records without that text are yielded unchanged; pass a list as `missing` to collect them.
+    """
+    for record in records:
+        if not record:
+            continue
+        text = text_of(record)
+        if text is None:
+            if missing is not None:
+                missing.append(record)
+            yield record
+            continue
+        yield {**record, **extract_sections(text)}
+
+
+#Function to re-derive the sections of a whole scraped file offline and rewrite it
+def rederive_sections(filename="products.json"):
+    records = load_previous(filename)
+    missing = []
+    count = run_pipeline(apply_sections(records, missing=missing), [JsonSink(filename)])
+    logger.info(f"Re-derived sections for {count - len(missing)} records in '{os.path.join('scraped_data', filename)}'")
+    if missing:
+        logger.warning(f"⚠️ {len(missing)} records have no '{POPUP_TEXT_FIELD}' (scraped before it was kept) and were left as they are.")
+    return count
+
+
+if __name__ == "__main__":
+    setup_logging()
+    rederive_sections()
@@ -0,0 +1,260 @@
+# site_benchmarks.py
+# End-to-end benchmarks against the local stand-in site (fixture_site.py):
+# items/sec, p50/p95 per-item latency and peak RSS for each scraper stage.
+# Run with: python site_benchmarks.py --latency 0.1 --dialog-delay 0.2
+# Results go to bench_results/site_<commit>.json so runs can be compared between commits.
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from fixture_site import FixtureSite, load_records, PRODUCTS_FILE
+from sections import SECTION_HEADINGS, POPUP_TEXT_FIELD, extract_sections
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+RESULTS_DIR = "bench_results"
+SCENARIOS = ("products", "products_prefetch", "brands", "brands_prefetch", "raw_materials", "documentation", "images")
+
+
+#Function to read a percentile from sorted values
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else None
+
+
+#Function to read the peak resident memory of this process and of its finished children, in MiB
+def peak_rss():
+    if resource is None:
+        return None, None
+    # ru_maxrss is in KiB on Linux
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024)
+
+
+#Function to record the time between consecutive calls of a module function
+def record_items(module, function_name, latencies):
+    """Wraps `module.function_name` so each call (one finished item) logs the time since the previous one."""
+    original = getattr(module, function_name)
+    last = [time.perf_counter()]
+
+    def wrapper(*args, **kwargs):
+        result = original(*args, **kwargs)
+        now = time.perf_counter()
+        latencies.append(now - last[0])
+        last[0] = now
+        return result
+
+    setattr(module, function_name, wrapper)
+
+
+#Function to record how long each call of a module (or class) function takes, for calls that run concurrently
+def record_calls(module, function_name, latencies):
+    original = getattr(module, function_name)
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = original(*args, **kwargs)
+        latencies.append(time.perf_counter() - start)
+        return result
+
+    setattr(module, function_name, wrapper)
+
+
+#Function to check the sections of products scraped from the fixture against the records it served
+def check_popup_sections(scraped, served):
+    """Golden check on captured pop-up texts: each dialog's text, as the browser renders it and
+    WebDriver reads it, must split into the sections of the record the fixture built it from."""
+    for record, source in zip(scraped, served):
+        expected = {heading: source.get(heading) for heading in SECTION_HEADINGS}
+        result = extract_sections(record[POPUP_TEXT_FIELD])
+        assert result == expected, f"Pop-up of {source.get('Name')} splits differently: {record[POPUP_TEXT_FIELD]!r} -> {result}"
+
+
+def bench_products(settings, latencies, page_times):
+    import products
+    from driver_setup import acquire_driver, release_driver
+
+    record_items(products, "build_product_record", latencies)
+    record_calls(products, "scrape_page", page_times)
+    driver = acquire_driver()
+    try:
+        # The fixture serves the products in file order, so the pages come back in the same order
+        scraped = list(products.iter_all_pages(driver, settings["products_url"], settings["pages"]))
+    finally:
+        release_driver(driver)
+    check_popup_sections(scraped, load_records(PRODUCTS_FILE))
+    return len(scraped)
+
+
+def bench_brands(settings, latencies, page_times):
+    import brand
+    from driver_setup import acquire_driver, release_driver
+
+    record_items(brand, "build_brand_record", latencies)
+    record_calls(brand, "scrape_page", page_times)
+    driver = acquire_driver()
+    try:
+        return sum(1 for _ in brand.iter_letters(driver, settings["brands_url"], settings["letters"]))
+    finally:
+        release_driver(driver)
+
+
+#Function to run a listing scenario with the next page loading in a background tab
+def bench_products_prefetch(settings, latencies, page_times):
+    from prefetch import PREFETCH_ENV
+
+    os.environ[PREFETCH_ENV] = "1"  # Each scenario runs in its own process
+    return bench_products(settings, latencies, page_times)
+
+
+def bench_brands_prefetch(settings, latencies, page_times):
+    from prefetch import PREFETCH_ENV
+
+    os.environ[PREFETCH_ENV] = "1"
+    return bench_brands(settings, latencies, page_times)
+
+
+def bench_raw_materials(settings, latencies, page_times):
+    import raw_materials
+
+    raw_materials.DOWNLOAD_DIRECTORY = tempfile.mkdtemp(prefix="bench_downloads_")
+    try:
+        start = time.perf_counter()
+        downloaded = raw_materials.download_excel(raw_materials.configure_driver(), settings["raw_materials_url"])
+        latencies.append(time.perf_counter() - start)
+        return 1 if downloaded else 0
+    finally:
+        shutil.rmtree(raw_materials.DOWNLOAD_DIRECTORY, ignore_errors=True)
+
+
+def bench_documentation(settings, latencies, page_times):
+    import task2
+
+    record_calls(task2, "render_material_file", latencies)
+    output_dir = tempfile.mkdtemp(prefix="bench_docs_")
+    try:
+        materials = task2.load_json(os.path.join("scraped_data", "raw_materials.json"))
+        brands = task2.load_json(os.path.join("scraped_data", "Brands.json"))
+        products = task2.load_json(os.path.join("scraped_data", "products.json"))
+        task2.generate_documentation(materials, brands, products, output_dir)
+        return len(latencies)
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def bench_images(settings, latencies, page_times):
+    import image_cache
+
+    record_calls(image_cache.ImageCache, "fetch", latencies)
+    directory = tempfile.mkdtemp(prefix="bench_images_")
+    try:
+        paths = image_cache.ImageCache(directory).fetch_all(settings["image_urls"])
+        return sum(1 for path in paths.values() if path)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+#Function to run one scenario and summarise it (runs in a fresh process so peak RSS is its own)
+def run_scenario(name, settings):
+    import rate_control
+
+    rate_control.configure(settings["max_rate"])
+    latencies, page_times = [], []
+    start = time.perf_counter()
+    items = globals()[f"bench_{name}"](settings, latencies, page_times)
+    seconds = time.perf_counter() - start
+
+    latencies.sort()
+    page_times.sort()
+    rss, child_rss = peak_rss()
+    return {
+        "items": items,
+        "seconds": round(seconds, 3),
+        "items_per_sec": round(items / seconds, 2) if seconds else None,
+        "p50_item_seconds": percentile(latencies, 0.5),
+        "p95_item_seconds": percentile(latencies, 0.95),
+        "pages": len(page_times),  # Listing pages (products and brands only), for per-page timings
+        "mean_page_seconds": round(sum(page_times) / len(page_times), 3) if page_times else None,
+        "p50_page_seconds": percentile(page_times, 0.5),
+        "peak_rss_mib": rss,
+        "peak_child_rss_mib": child_rss,  # Largest finished child, i.e. chromedriver/Chrome
+    }
+
+
+#Function to read the current commit so results can be compared between commits
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(scenarios=SCENARIOS, latency=0.0, dialog_delay=0.0, pages=2, letters=("A", "B"), output=None, max_rate=1000.0):
+    commit = current_commit()
+    results = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {"latency": latency, "dialog_delay": dialog_delay, "pages": pages, "letters": list(letters), "max_rate": max_rate},
+        "scenarios": {},
+    }
+
+    with FixtureSite(latency, dialog_delay) as site:
+        settings = {
+            "products_url": site.tab_url("products"),
+            "brands_url": site.tab_url("brands"),
+            "raw_materials_url": site.tab_url("raw-materials"),
+            "pages": pages,
+            "letters": list(letters),
+            "image_urls": [site.image_url("products", index) for index in range(len(site.products))],
+            "max_rate": max_rate,
+        }
+        context = multiprocessing.get_context("spawn")
+        for name in scenarios:
+            print(f"⏱️ Running {name} benchmark...")
+            try:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    result = executor.submit(run_scenario, name, settings).result()
+            except Exception as e:
+                print(f"❌ {name} benchmark failed: {e}")
+                result = {"error": str(e)}
+            results["scenarios"][name] = result
+            if "error" not in result:
+                print(f"   {result['items']} items, {result['items_per_sec']} items/s, "
+                      f"p50 {result['p50_item_seconds'] or 0:.3f}s, p95 {result['p95_item_seconds'] or 0:.3f}s")
+                if result["pages"]:
+                    print(f"   {result['pages']} pages, {result['mean_page_seconds']:.3f}s mean per page")
+
+        # Per-page time saved by loading the next page in a background tab
+        for name in ("products", "brands"):
+            plain, prefetched = results["scenarios"].get(name, {}), results["scenarios"].get(f"{name}_prefetch", {})
+            if plain.get("mean_page_seconds") and prefetched.get("mean_page_seconds"):
+                saving = plain["mean_page_seconds"] - prefetched["mean_page_seconds"]
+                results[f"{name}_prefetch_saving_seconds_per_page"] = round(saving, 3)
+                print(f"📉 {name}: prefetching saves {saving:.3f}s per page")
+
+    output = output or os.path.join(RESULTS_DIR, f"site_{commit}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+    print(f"Benchmark results saved in '{output}'")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers against the local stand-in NATRUE site.")
+    parser.add_argument("scenarios", nargs="*", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every page, API and export response")
+    parser.add_argument("--dialog-delay", type=float, default=0.0, help="seconds before a pop-up opens after a click")
+    parser.add_argument("--pages", type=int, default=2, help="product listing pages to scrape")
+    parser.add_argument("--letters", default="AB", help="brand letters to scrape, e.g. 'ABC#'")
+    parser.add_argument("--max-rate", type=float, default=1000.0, help="request-rate cap for the scrapers (the fixture is local, so it is high by default)")
+    parser.add_argument("--output", help="results file (default: bench_results/site_<commit>.json)")
+    args = parser.parse_args()
+    main(args.scenarios, args.latency, args.dialog_delay, args.pages, tuple(args.letters), args.output, args.max_rate)
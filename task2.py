@@ -1,14 +1,22 @@
+import logging
 import json
 import os
 import re
-from data_saver import upload_to_drive
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from drive_sync import DriveSync
+from inci_matcher import InciMatcher
+from metrics import setup_logging
+
+logger = logging.getLogger(__name__)
+
 # Function to load JSON data from a file
 def load_json(file_path):
     try:
         with open(file_path, 'r', encoding='utf-8') as file:
             return json.load(file)
     except Exception as e:
-        print(f"Error loading {file_path}: {e}")
+        logger.error(f"Error loading {file_path}: {e}")
         return []
 
 # Function to sanitize file names (removes invalid characters)
@@ -35,89 +43,123 @@ def is_material_used_in_product(material_inci, product_ingredients):
             return True
     return False
 
-# Function to generate documentation for each material
-def generate_documentation(materials, brands, products, output_dir, drive_folder_id=None):
-    os.makedirs(output_dir, exist_ok=True)  
+# Function to build the documentation file name for a material
+def material_file_name(material_name):
+    return sanitize_filename(material_name.lower().replace(' ', '_').replace('®', '').replace('.', '')) + '.doc'
+
+# Function to map every material document to the products, brands and countries that use it
+def build_material_map(materials, brands, products):
+    # Index brands once instead of scanning the list for every product
+    brand_countries = {}
+    for brand in brands:
+        brand_countries.setdefault(brand.get('Name', '').strip().lower(), brand.get('Countries', []))
 
-    material_product_map = {material.get('Name', 'Unknown Material'): [] for material in materials}
+    # Build the INCI automaton once; each product's ingredients are then scanned a single time
+    matcher = InciMatcher(materials)
 
-    for product in products:
+    material_map = {}
+    material_entries = {}
+    for index, material in enumerate(materials):
+        if not material:
+            continue
+        # Materials sharing a file name share one document; the last one provides the header
+        entry = material_map.setdefault(material_file_name(material.get('Name', 'Unknown Material')),
+                                        {"products": {}, "brands": {}, "countries": {}})
+        entry["material"] = material
+        material_entries[index] = entry
+
+    # Dicts keep first-seen order and drop repeats when several materials share a document
+    for position, product in enumerate(products):
         if not product:
             continue
 
-        product_name = product.get('Name', 'Unknown Product')
         brand_name = product.get('Brand', 'Unknown Brand')
-        countries = get_countries_by_brand(brand_name, brands)
-        product_ingredients = product.get('Ingredients', '')
-
-        print(f"Processing Product: {product_name}, Brand: {brand_name}, Countries: {countries}")
-
-        for material in materials:
-            if not material:
-                continue
-
-            material_name = material.get('Name', 'Unknown Material')
-            material_slug = sanitize_filename(material_name.lower().replace(' ', '_').replace('®', '').replace('.', ''))
-            file_name = f"{material_slug}.doc"
-            file_path = os.path.join(output_dir, file_name)
-
-            # Get the INCI list for the material
-            inci_list = material.get('INCI', '')
-
-            # Check if the product uses the material
-            if is_material_used_in_product(inci_list, product_ingredients):
-                material_product_map[material_name].append(product_name)
-
-            try:
-                with open(file_path, 'w', encoding='utf-8') as file:
-                    file.write(f"{material_name}\n\n")
-                    file.write(f"Manufacturer: {material.get('Manufacturer', 'N/A')}\n\n")
-                    file.write(f"Composition: {material.get('Composition', 'N/A')}\n\n")
-                    file.write("INCI List:\n")
-                    file.write(inci_list if inci_list else 'N/A')
-                    file.write("\n\n")
-                    file.write(f"Status: {material.get('Status', 'N/A')}\n\n")
-                    file.write(f"Expiration Date: {material.get('Expiration', 'N/A')}\n\n")
-
-                    file.write(f"Brand: {brand_name}\n\n")
-                    file.write(f"Countries: {', '.join(countries) if countries else 'Not available'}\n\n")
-
-                # Upload file to Google Drive
-                if drive_folder_id:
-                    upload_to_drive(file_path, drive_folder_id)
-
-            except PermissionError:
-                print(f"Permission denied: {file_path}. Skipping this file.")
-                continue
-
-    # Append product list to material documentation
-    for material in materials:
-        material_name = material.get('Name', 'Unknown Material')
-        file_name = sanitize_filename(material_name.lower().replace(' ', '_').replace('®', '').replace('.', '')) + '.doc'
-        file_path = os.path.join(output_dir, file_name)
-
-        if material_product_map.get(material_name):
-            try:
-                with open(file_path, 'a', encoding='utf-8') as file:
-                    file.write("\nProducts using this material:\n")
-                    for product in material_product_map[material_name]:
-                        file.write(f"- {product}\n")
-                    file.write("\n---\n\n")
-
-                # Upload updated file to Google Drive
-                if drive_folder_id:
-                    upload_to_drive(file_path, drive_folder_id)
-
-            except PermissionError:
-                print(f"Permission denied: {file_path}. Skipping this file.")
-                continue
-
-def main():
+        countries = brand_countries.get(brand_name.strip().lower(), [])
+
+        for index in matcher.match(product.get('Ingredients', '')):
+            entry = material_entries[index]
+            entry["products"][position] = product.get('Name', 'Unknown Product')
+            entry["brands"][brand_name] = None
+            entry["countries"].update(dict.fromkeys(countries))
+
+    return material_map
+
+# Function to render the documentation text for a single material
+def render_material_doc(entry):
+    material = entry["material"]
+    inci_list = material.get('INCI', '')
+
+    lines = [
+        f"{material.get('Name', 'Unknown Material')}\n\n",
+        f"Manufacturer: {material.get('Manufacturer', 'N/A')}\n\n",
+        f"Composition: {material.get('Composition', 'N/A')}\n\n",
+        "INCI List:\n",
+        inci_list if inci_list else 'N/A',
+        "\n\n",
+        f"Status: {material.get('Status', 'N/A')}\n\n",
+        f"Expiration Date: {material.get('Expiration', 'N/A')}\n\n",
+        f"Brands: {', '.join(entry['brands']) if entry['brands'] else 'Not available'}\n\n",
+        f"Countries: {', '.join(entry['countries']) if entry['countries'] else 'Not available'}\n\n",
+    ]
+
+    if entry["products"]:
+        lines.append("\nProducts using this material:\n")
+        lines.extend(f"- {product}\n" for product in entry["products"].values())
+        lines.append("\n---\n\n")
+
+    return "".join(lines)
+
+# Function to write a rendered document, skipping it when the content hash is unchanged
+def write_if_changed(file_path, content):
+    data = content.encode('utf-8')
+    try:
+        with open(file_path, 'rb') as file:
+            if hashlib.sha256(file.read()).digest() == hashlib.sha256(data).digest():
+                return False
+    except FileNotFoundError:
+        pass
+
+    with open(file_path, 'wb') as file:
+        file.write(data)
+    return True
+
+# Function to render one material document; returns the path if it was (re)written
+def render_material_file(output_dir, file_name, entry):
+    file_path = os.path.join(output_dir, file_name)
+    try:
+        return file_path if write_if_changed(file_path, render_material_doc(entry)) else None
+    except PermissionError:
+        logger.error(f"Permission denied: {file_path}. Skipping this file.")
+        return None
+
+# Function to generate documentation for each material
+def generate_documentation(materials, brands, products, output_dir, drive_folder_id=None, max_workers=8, drive_service=None):
+    os.makedirs(output_dir, exist_ok=True)
+
+    material_map = build_material_map(materials, brands, products)
+
+    # Each document is rendered exactly once; unchanged files are left untouched
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda item: render_material_file(output_dir, *item), material_map.items())
+        written = [file_path for file_path in results if file_path]
+
+    logger.info(f"Rendered {len(material_map)} material documents, {len(written)} new or changed.")
+
+    # One folder listing, then only files missing from Drive or with a different MD5 are sent
+    if drive_folder_id:
+        paths = [os.path.join(output_dir, file_name) for file_name in material_map]
+        try:
+            DriveSync(drive_folder_id, drive_service).sync(paths)
+        except FileNotFoundError as e:
+            # No service-account keyfile: the documents are still on disk
+            logger.warning(f"⚠️ Skipping the Google Drive upload: {e}")
+
+    return written
+
+def main(output_dir='material_docs', drive_folder_id=None):
     products_file = 'scraped_data/products.json'
     materials_file = 'scraped_data/raw_materials.json'
     brands_file = 'scraped_data/Brands.json'
-    output_dir = 'material_docs'
-    drive_folder_id = "google drive folder id"  
 
     # Load the data
     products = load_json(products_file)
@@ -125,12 +167,13 @@ def main():
     brands = load_json(brands_file)
 
     # Debugging: Print sample data to verify JSON is loaded correctly
-    print(f"Loaded {len(products)} products, {len(materials)} materials, {len(brands)} brands")
+    logger.info(f"Loaded {len(products)} products, {len(materials)} materials, {len(brands)} brands")
 
-    # Generate documentation and upload to Google Drive
+    # Generate documentation, and sync it to Google Drive if a folder is given
     generate_documentation(materials, brands, products, output_dir, drive_folder_id)
-    print(f"Documentation generated in '{output_dir}' directory and uploaded to Google Drive.")
+    logger.info(f"Documentation generated in '{output_dir}' directory.")
 
 if __name__ == '__main__':
+    setup_logging()
     main()
 
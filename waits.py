@@ -0,0 +1,174 @@
+# waits.py
+# Condition-based waits for the pop-up loop, replacing fixed sleeps.
+# Every wait records how long it really took so timeouts can be tuned from data.
+import logging
+import json
+import os
+import time
+from collections import defaultdict
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, WebDriverException
+from rate_control import TransientError, request
+from metrics import timer
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.1
+LISTING_TIMEOUT = 10
+DIALOG_OPEN_TIMEOUT = 5
+SAME_CONTENT_TIMEOUT = 1  # How long an unchanged dialog gets to re-render before its text is taken as the new item's
+DIALOG_CLOSE_TIMEOUT = 3
+DOWNLOAD_TIMEOUT = 30
+DOWNLOAD_POLL_INTERVAL = 0.25
+
+# Condition name -> list of (seconds waited, timed out)
+wait_timings = defaultdict(list)
+
+
+#Function to wait for a condition and record how long it took
+def wait_for(driver, condition, name, timeout, poll_frequency=POLL_INTERVAL):
+    """Waits until `condition` is truthy; raises TimeoutException like WebDriverWait."""
+    start = time.perf_counter()
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(condition)
+    except TimeoutException:
+        wait_timings[name].append((time.perf_counter() - start, True))
+        raise
+    wait_timings[name].append((time.perf_counter() - start, False))
+    return result
+
+
+#Function to open a listing page through the shared rate controller
+def open_listing(driver, url, item_class, list_class, timeout=LISTING_TIMEOUT, prefetcher=None):
+    """Returns True once the page shows its cards and False if it loaded without any (past the last page).
+
+    A page that did not render its list at all (timeout, error page, lost
+    connection) raises TransientError, so the controller backs off and the
+    caller can retry the page. A page a prefetcher is already loading in its
+    background tab is switched to instead of navigated to, and its request,
+    counted since the prefetch started, ends here. The timeout spent on a page
+    without cards is left out of the latency the controller sees.
+    """
+    started = prefetcher.take(url) if prefetcher else None
+    with request(started) as attempt:
+        waited_from = None  # A navigation that timed out keeps its full latency
+        try:
+            with timer("navigate"):
+                if started is None:
+                    driver.get(url)
+            waited_from = time.perf_counter()
+            with timer("listing_wait"):
+                wait_for(driver, EC.presence_of_element_located((By.CLASS_NAME, item_class)), "listing", timeout)
+            return True
+        except TimeoutException:
+            if not driver.find_elements(By.CLASS_NAME, list_class):
+                raise TransientError(f"Page did not load: {url}")
+            # An empty page answered normally; waiting out the timeout for cards is not the server being slow
+            attempt.stop(waited_from)
+        except WebDriverException as e:
+            raise TransientError(f"Page did not load: {url} ({e.msg})") from e
+    return False
+
+
+#Condition: the dialog is displayed with text and is not the previous item's
+def dialog_replaced(locator, previous, previous_text, same_content_timeout):
+    """A re-rendered dialog is a new element (the previous one went stale), and a reused one gets
+    new text. The same element with the same text is accepted once it stayed that way for
+    `same_content_timeout`, since two consecutive items can share their text."""
+    unchanged_since = []
+
+    def condition(driver):
+        try:
+            element = driver.find_element(*locator)
+            if not element.is_displayed():
+                return False
+            text = element.text
+        except (NoSuchElementException, StaleElementReferenceException):
+            return False
+        if not text:
+            return False
+        if previous is None or element != previous or text != previous_text:
+            return element
+        if not unchanged_since:
+            unchanged_since.append(time.perf_counter())
+        return element if time.perf_counter() - unchanged_since[0] >= same_content_timeout else False
+    return condition
+
+
+#Function to wait until a dialog is open and showing the new item's content
+def wait_for_dialog(driver, locator, previous=None, previous_text=None, timeout=DIALOG_OPEN_TIMEOUT,
+                    same_content_timeout=SAME_CONTENT_TIMEOUT):
+    """Returns the dialog element once it is visible with fresh content.
+
+    `previous` and `previous_text` are the element and text returned for the
+    previous item; the new dialog is told apart by its identity or its text.
+    """
+    return wait_for(driver, dialog_replaced(locator, previous, previous_text, same_content_timeout), "dialog_open", timeout)
+
+
+#Function to wait until a dialog has closed; returns False if it is still open
+def wait_for_dialog_closed(driver, locator, timeout=DIALOG_CLOSE_TIMEOUT):
+    try:
+        wait_for(driver, EC.invisibility_of_element_located(locator), "dialog_close", timeout)
+        return True
+    except TimeoutException:
+        return False
+
+
+#Condition: a file that was not in `before` has finished downloading and its size has settled
+def download_finished(directory, before, extension):
+    """Chrome writes to `<name>.crdownload` and renames it when done; we also
+    require the same size on two consecutive polls before handing the file over.
+    Partial files already in `before` (left by a crashed run) are ignored."""
+    sizes = {}
+
+    def condition(driver):
+        names = [name for name in os.listdir(directory) if name not in before]
+        if any(name.endswith(".crdownload") for name in names):
+            return False
+        new_files = [os.path.join(directory, name) for name in names if name.endswith(extension)]
+        if not new_files:
+            return False
+        newest = max(new_files, key=os.path.getmtime)
+        size = os.path.getsize(newest)
+        if size and sizes.get(newest) == size:
+            return newest
+        sizes[newest] = size
+        return False
+    return condition
+
+
+#Function to wait for a new download to complete; returns its path or None on timeout
+def wait_for_download(driver, directory, before, extension, timeout=DOWNLOAD_TIMEOUT):
+    try:
+        return wait_for(driver, download_finished(directory, before, extension), "download", timeout, DOWNLOAD_POLL_INTERVAL)
+    except TimeoutException:
+        return None
+
+
+#Function to summarise the recorded waits per condition
+def wait_summary():
+    summary = {}
+    for name, timings in wait_timings.items():
+        durations = sorted(seconds for seconds, _ in timings)
+        summary[name] = {
+            "count": len(durations),
+            "timeouts": sum(1 for _, timed_out in timings if timed_out),
+            "mean": sum(durations) / len(durations),
+            "p95": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+            "max": durations[-1],
+        }
+    return summary
+
+
+#Function to save the wait summary next to the scraped data
+def save_wait_timings(filename):
+    os.makedirs("scraped_data", exist_ok=True)
+    filepath = os.path.join("scraped_data", filename)
+
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(wait_summary(), f, indent=4)
+
+    logger.info(f"Wait timings saved in '{filepath}'")